@@ -0,0 +1,210 @@
+"""Synthetic DSW dataset for benchmarks.
+
+Seeds a fresh tenant with a package version chain, document templates with
+assets and files, questionnaires with events, files and versions, and their
+documents. S3 objects are written to a local directory in the layout read
+by `storage.LocalObjectStore` (files named by object key).
+"""
+import datetime
+import pathlib
+import random
+import uuid
+
+from typing import NamedTuple
+
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from dsw_bootstrapper import models, schemas
+from dsw_bootstrapper.db import Base
+
+INSERT_BATCH = 10_000
+
+
+class Scale(NamedTuple):
+    packages: int  # length of the package version chain
+    package_events: int
+    templates: int
+    assets: int  # per template
+    files: int  # per template
+    questionnaires: int
+    events: int  # per questionnaire
+    questionnaire_files: int  # per questionnaire
+    versions: int  # per questionnaire
+    documents: int  # per questionnaire
+    object_size: int  # bytes per S3 object
+
+
+SCALES = {
+    "small": Scale(packages=5, package_events=100, templates=1, assets=5, files=10, questionnaires=2,
+                   events=500, questionnaire_files=2, versions=2, documents=1, object_size=16 * 1024),
+    "medium": Scale(packages=20, package_events=1_000, templates=3, assets=50, files=50, questionnaires=10,
+                    events=5_000, questionnaire_files=5, versions=5, documents=2, object_size=256 * 1024),
+    "large": Scale(packages=50, package_events=5_000, templates=5, assets=200, files=200, questionnaires=20,
+                   events=25_000, questionnaire_files=10, versions=10, documents=3, object_size=1024 ** 2),
+}
+
+
+class Generator:
+
+    def __init__(self, db: Session, objects: pathlib.Path, scale: Scale, seed: int = 0):
+        self.db = db
+        self.objects = objects
+        self.scale = scale
+        self.random = random.Random(seed)
+        self.tenant_uuid = uuid.uuid4()
+        self.now = datetime.datetime.now(tz=datetime.UTC)
+        # package and template ids are global, keep them unique per tenant
+        self.org_id = f"bench{self.tenant_uuid.hex[:8]}"
+
+    def _insert(self, model: type, rows: list[dict]):
+        for i in range(0, len(rows), INSERT_BATCH):
+            self.db.execute(insert(model), rows[i:i + INSERT_BATCH])
+
+    def _object(self, path: str, compressible: bool) -> int:
+        size = self.scale.object_size
+        if compressible:
+            data = (b"<p>Lorem ipsum dolor sit amet, consectetur adipiscing elit.</p>\n" * (size // 64 + 1))[:size]
+        else:
+            data = self.random.randbytes(size)
+        target = self.objects / str(self.tenant_uuid) / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+        return size
+
+    def _packages(self) -> str:
+        rows = []
+        previous = None
+        for i in range(self.scale.packages):
+            package_id = f"{self.org_id}:km:1.{i}.0"
+            rows.append({
+                "id": package_id, "name": f"Knowledge Model {i}", "organization_id": self.org_id, "km_id": "km",
+                "version": f"1.{i}.0", "metamodel_version": 14, "description": "Generated package",
+                "readme": "# Readme\n" * 100, "license": "Apache-2.0", "previous_package_id": previous,
+                "fork_of_package_id": None, "merge_checkpoint_package_id": None,
+                "events": [
+                    {"eventType": "AddQuestionEvent", "uuid": str(uuid.uuid4()), "title": f"Question {n}"}
+                    for n in range(self.scale.package_events)
+                ],
+                "created_at": self.now, "tenant_uuid": self.tenant_uuid,
+                "phase": "ReleasedPackagePhase", "non_editable": False,
+            })
+            previous = package_id
+        self._insert(models.Package, rows)
+        return previous
+
+    def _template(self, n: int) -> tuple[str, uuid.UUID]:
+        template_id = f"{self.org_id}:dt-{n}:1.0.0"
+        format_uuid = uuid.uuid4()
+        common = {"document_template_id": template_id, "tenant_uuid": self.tenant_uuid,
+                  "created_at": self.now, "updated_at": self.now}
+        self._insert(models.DocumentTemplate, [{
+            "id": template_id, "name": f"Template {n}", "organization_id": self.org_id,
+            "template_id": f"dt-{n}", "version": "1.0.0", "metamodel_version": "16",
+            "description": "Generated template", "readme": "# Readme\n" * 100, "license": "Apache-2.0",
+            "allowed_packages": [{"orgId": None, "kmId": None, "minVersion": None, "maxVersion": None}],
+            "created_at": self.now, "tenant_uuid": self.tenant_uuid, "updated_at": self.now,
+            "phase": "ReleasedDocumentTemplatePhase", "non_editable": False,
+        }])
+        assets = []
+        for i in range(self.scale.assets):
+            asset_uuid = uuid.uuid4()
+            size = self._object(f"templates/{template_id}/{asset_uuid}", compressible=False)
+            assets.append({**common, "uuid": asset_uuid, "file_name": f"asset-{i}.png",
+                           "content_type": "image/png", "file_size": size})
+        self._insert(models.DocumentTemplateAsset, assets)
+        self._insert(models.DocumentTemplateFile, [
+            {**common, "uuid": uuid.uuid4(), "file_name": f"src/file-{i}.html.j2",
+             "content": "{% for reply in replies %}<p>{{ reply }}</p>{% endfor %}\n" * 50}
+            for i in range(self.scale.files)
+        ])
+        self._insert(models.DocumentTemplateFormat, [
+            {**common, "uuid": format_uuid, "name": "HTML", "icon": "fas fa-file-code"},
+        ])
+        self._insert(models.DocumentTemplateFormatStep, [
+            {**common, "format_uuid": format_uuid, "position": 0, "name": "jinja", "options": {"template": "src/file-0.html.j2"}},
+        ])
+        return template_id, format_uuid
+
+    def _questionnaire(self, n: int, package_id: str, template_id: str, format_uuid: uuid.UUID) -> \
+            tuple[uuid.UUID, list[uuid.UUID]]:
+        questionnaire_uuid = uuid.uuid4()
+        common = {"questionnaire_uuid": questionnaire_uuid, "tenant_uuid": self.tenant_uuid, "created_by": None}
+        self._insert(models.Questionnaire, [{
+            "uuid": questionnaire_uuid, "name": f"Project {n}", "visibility": "PrivateQuestionnaire",
+            "sharing": "RestrictedQuestionnaire", "package_id": package_id, "selected_question_tag_uuids": [],
+            "document_template_id": template_id, "format_uuid": format_uuid, "created_by": None,
+            "created_at": self.now, "updated_at": self.now, "description": None, "is_template": False,
+            "squashed": True, "tenant_uuid": self.tenant_uuid, "project_tags": ["benchmark"],
+        }])
+        events = [
+            {**common, "uuid": uuid.uuid4(), "event_type": "SetReplyEvent", "path": f"chapter.question-{i}",
+             "created_at": self.now, "value_type": "StringReply", "value": [f"Reply {i}"], "value_id": None,
+             "value_raw": None}
+            for i in range(self.scale.events)
+        ]
+        self._insert(models.QuestionnaireEvent, events)
+        files = []
+        for i in range(self.scale.questionnaire_files):
+            file_uuid = uuid.uuid4()
+            size = self._object(f"questionnaire-files/{questionnaire_uuid}/{file_uuid}", compressible=False)
+            files.append({**common, "uuid": file_uuid, "file_name": f"attachment-{i}.pdf",
+                          "content_type": "application/pdf", "file_size": size, "created_at": self.now})
+        self._insert(models.QuestionnaireFile, files)
+        self._insert(models.QuestionnaireVersion, [
+            {**common, "uuid": uuid.uuid4(), "name": f"v{i}", "description": None,
+             "event_uuid": events[i * len(events) // self.scale.versions]["uuid"],
+             "created_at": self.now, "updated_at": self.now}
+            for i in range(self.scale.versions if events else 0)
+        ])
+        documents = []
+        for i in range(self.scale.documents):
+            document_uuid = uuid.uuid4()
+            size = self._object(f"documents/{document_uuid}", compressible=True)
+            documents.append({
+                **common, "uuid": document_uuid, "name": f"Document {n}-{i}", "state": "DoneDocumentState",
+                "durability": "PersistentDocumentDurability",
+                "questionnaire_event_uuid": events[-1]["uuid"] if events else uuid.uuid4(),
+                "questionnaire_replies_hash": i, "document_template_id": template_id, "format_uuid": format_uuid,
+                "file_name": f"document-{i}.html", "content_type": "text/html", "file_size": size,
+                "worker_log": "Document generated\n" * 20, "retrieved_at": self.now, "finished_at": self.now,
+                "created_at": self.now,
+            })
+        self._insert(models.Document, documents)
+        return questionnaire_uuid, [document["uuid"] for document in documents]
+
+    def generate(self) -> schemas.RecipeInstruction:
+        """Seed the tenant and return an instruction selecting all of its contents."""
+        self._insert(models.Tenant, [{"uuid": self.tenant_uuid, "tenant_id": self.org_id, "name": "Benchmark"}])
+        package_id = self._packages()
+        templates = [self._template(n) for n in range(self.scale.templates)]
+        questionnaires = []
+        documents = []
+        for n in range(self.scale.questionnaires):
+            template_id, format_uuid = templates[n % len(templates)]
+            questionnaire_uuid, document_uuids = self._questionnaire(n, package_id, template_id, format_uuid)
+            questionnaires.append(questionnaire_uuid)
+            documents.extend(document_uuids)
+        self.db.commit()
+        return schemas.RecipeInstruction(
+            name="Benchmark",
+            tenantUuid=self.tenant_uuid,
+            packages=[schemas.PackageIn(id=package_id, includeDependencies=True)],
+            documentTemplates=[schemas.DocumentTemplateIn(id=template_id) for template_id, _ in templates],
+            questionnaires=[
+                schemas.QuestionnaireIn(uuid=questionnaire_uuid, newUuid=False, anonymize=False,
+                                        includeDependencies=True, includeVersions=True)
+                for questionnaire_uuid in questionnaires
+            ],
+            documents=[
+                schemas.DocumentIn(uuid=document_uuid, newUuid=False, anonymize=False, includeDependencies=True)
+                for document_uuid in documents
+            ],
+        )
+
+    def cleanup(self):
+        for table in reversed(Base.metadata.sorted_tables):
+            if "tenant_uuid" in table.c:
+                self.db.execute(delete(table).where(table.c.tenant_uuid == self.tenant_uuid))
+        self.db.execute(delete(models.Tenant).where(models.Tenant.uuid == self.tenant_uuid))
+        self.db.commit()
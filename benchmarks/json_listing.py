@@ -0,0 +1,105 @@
+"""JSON serialization of tenant content listings: validated schemas vs row dicts.
+
+Serializes synthetic questionnaire rows (plain tuples with attribute
+access like the `Row` objects of a column select, no database needed) to
+the `TenantContents` JSON three ways: validating every row into its schema
+and letting FastAPI validate and serialize the response model again (as
+`tenant_contents` did before), validating rows but dumping the model to JSON
+directly, and the fast path dumping row dicts with `pydantic_core.to_json`.
+
+Usage: python benchmarks/json_listing.py [ROWS]
+"""
+import json
+import sys
+import time
+import uuid
+
+from typing import Callable, NamedTuple
+
+import pydantic_core
+
+from pydantic import TypeAdapter
+
+from dsw_bootstrapper import contents, schemas
+
+DEFAULT_ROWS = 50_000
+REPEAT = 3
+
+
+class QuestionnaireRow(NamedTuple):
+    uuid: uuid.UUID
+    name: str
+    package_id: str
+    document_template_id: str | None
+    format_uuid: uuid.UUID | None
+
+
+def questionnaires(count: int) -> list[QuestionnaireRow]:
+    template, fmt = "org:dt:1.0.0", uuid.uuid4()
+    return [
+        QuestionnaireRow(uuid.uuid4(), f"Project {i} \"draft\"", "org:km:1.4.0",
+                         template if i % 3 else None, fmt if i % 3 else None)
+        for i in range(count)
+    ]
+
+
+def validated(rows: list[QuestionnaireRow]) -> schemas.TenantContents:
+    return schemas.TenantContents.model_validate({
+        "questionnaires": [
+            schemas.QuestionnaireOut.model_validate(row, from_attributes=True, by_alias=False, by_name=True)
+            for row in rows
+        ],
+    })
+
+
+def response_model(rows: list[QuestionnaireRow]) -> bytes:
+    # what FastAPI does with a returned model: dump it to a dict, validate
+    # that against the response model again, serialize and encode with `json`
+    adapter = TypeAdapter(schemas.TenantContents)
+    value = adapter.validate_python(validated(rows).model_dump(by_alias=True))
+    content = adapter.dump_python(value, mode="json", by_alias=True)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def model_dump(rows: list[QuestionnaireRow]) -> bytes:
+    return validated(rows).model_dump_json(by_alias=True).encode("utf-8")
+
+
+def row_dicts(rows: list[QuestionnaireRow]) -> bytes:
+    return pydantic_core.to_json({
+        "packages": [],
+        "documentTemplates": [],
+        "questionnaires": contents.row_dicts(contents.CONTENT_KINDS["questionnaires"], rows),
+        "documents": [],
+    })
+
+
+def measure(render: Callable[[], bytes]) -> tuple[float, bytes]:
+    best, body = float("inf"), b""
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        body = render()
+        best = min(best, time.perf_counter() - start)
+    return best, body
+
+
+def main(count: int):
+    rows = questionnaires(count)
+    print(f"{count:,} questionnaire rows (best of {REPEAT})")
+    print(f"  {'serialization':<40} {'time [ms]':>10} {'rows/s':>12} {'size [MiB]':>11}")
+    expected = None
+    for name, render in (
+        ("validated + response model (previous)", lambda: response_model(rows)),
+        ("validated + model_dump_json", lambda: model_dump(rows)),
+        ("row dicts + pydantic_core.to_json", lambda: row_dicts(rows)),
+    ):
+        seconds, body = measure(render)
+        if expected is None:
+            expected = json.loads(body)
+        elif json.loads(body) != expected:
+            raise AssertionError(f"{name} serializes differently")
+        print(f"  {name:<40} {seconds * 1000:>10.1f} {count / seconds:>12,.0f} {len(body) / 1024 ** 2:>11.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS)
@@ -0,0 +1,101 @@
+"""Bytes transferred from PostgreSQL per endpoint, with and without deferred columns.
+
+Runs the queries behind the listing endpoints and a recipe build against the
+configured DSW database (and S3) twice: once as is and once with every
+deferred column undeferred, i.e. as all columns used to be loaded eagerly.
+Transferred bytes are approximated by the size of the fetched values.
+
+Usage: python benchmarks/pg_bytes.py TENANT_UUID [RECIPE_JSON ...]
+"""
+import contextlib
+import pathlib
+import sys
+import tempfile
+import uuid
+
+import psycopg2.extensions
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session, undefer
+
+from dsw_bootstrapper import contents, logic, models, schemas
+from dsw_bootstrapper.config import Config
+
+
+class CountingCursor(psycopg2.extensions.cursor):
+    fetched_bytes = 0
+
+    @classmethod
+    def count(cls, rows):
+        for row in rows:
+            cls.fetched_bytes += sum(len(value if isinstance(value, (str, bytes)) else str(value))
+                                     for value in row if value is not None)
+        return rows
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            self.count([row])
+        return row
+
+    def fetchmany(self, size=None):
+        return self.count(super().fetchmany(size) if size is not None else super().fetchmany())
+
+    def fetchall(self):
+        return self.count(super().fetchall())
+
+
+@contextlib.contextmanager
+def eager_columns(db: Session):
+    def _undefer_all(orm_execute_state):
+        if orm_execute_state.is_select and not orm_execute_state.is_column_load:
+            with contextlib.suppress(Exception):
+                orm_execute_state.statement = orm_execute_state.statement.options(undefer("*"))
+
+    event.listen(db, "do_orm_execute", _undefer_all)
+    try:
+        yield
+    finally:
+        event.remove(db, "do_orm_execute", _undefer_all)
+
+
+def measure(db: Session, action, eager: bool) -> int:
+    db.expunge_all()
+    CountingCursor.fetched_bytes = 0
+    with eager_columns(db) if eager else contextlib.nullcontext():
+        action()
+    return CountingCursor.fetched_bytes
+
+
+def build(db: Session, instruction: schemas.RecipeInstruction):
+    with tempfile.TemporaryDirectory() as tmp:
+        logic.build_recipe_file(instruction, db, pathlib.Path(tmp) / "recipe.zip", logic.BuildProgress())
+
+
+def main(tenant_uuid: uuid.UUID, recipe_paths: list[str]):
+    engine = create_engine(Config.DATABASE_URL, connect_args={"cursor_factory": CountingCursor})
+    actions = {
+        "/api/tenants": lambda: db.query(models.Tenant).all(),
+    }
+    for name, kind in contents.CONTENT_KINDS.items():
+        actions[f"/api/tenants/{{uuid}}/contents/{name}"] = (
+            lambda kind=kind: contents.query_rows(db, tenant_uuid, kind)
+        )
+    for path in recipe_paths:
+        instruction = schemas.RecipeInstruction.model_validate_json(pathlib.Path(path).read_text(encoding="utf-8"))
+        actions[f"/api/recipe ({path})"] = lambda instruction=instruction: build(db, instruction)
+
+    print(f"{'endpoint':<56} {'eager':>14} {'deferred':>14} {'saved':>7}")
+    with Session(engine) as db:
+        db.execute(text("SELECT 1"))  # connection setup is not counted
+        for name, action in actions.items():
+            eager = measure(db, action, eager=True)
+            deferred = measure(db, action, eager=False)
+            saved = 1 - deferred / eager if eager else 0
+            print(f"{name:<56} {eager:>14,} {deferred:>14,} {saved:>7.1%}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    main(uuid.UUID(sys.argv[1]), sys.argv[2:])
@@ -0,0 +1,86 @@
+"""Recipe build and content listing performance on synthetic datasets.
+
+For each scale (see `dataset.SCALES`) a fresh tenant is generated in the
+configured PostgreSQL database, with S3 objects served from a temporary
+directory, and a recipe of all its contents is built. Reported are the build
+time, peak Python memory (of a separate traced build), ORM query count, S3
+bytes read, archive size and the time to list the first page of each content
+kind. Tables are created if missing and the generated tenant is deleted
+afterwards; use a scratch database rather than the one of a live DSW instance.
+
+Usage: python benchmarks/recipe_build.py [SCALE ...]
+"""
+import pathlib
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy.orm import Session
+
+from dataset import SCALES, Generator
+from dsw_bootstrapper import contents, logic, schemas
+from dsw_bootstrapper.cache import artifact_cache
+from dsw_bootstrapper.db import Base, SessionLocal, get_engine
+from dsw_bootstrapper.storage import LocalObjectStore
+
+LIST_LIMIT = 100
+
+
+def build(db: Session, instruction: schemas.RecipeInstruction, path: pathlib.Path,
+          store: LocalObjectStore) -> tuple[float, logic.BuildProgress]:
+    progress = logic.BuildProgress()
+    db.expunge_all()
+    start = time.perf_counter()
+    logic.build_recipe_file(instruction, db, path, progress, s3_client=store)
+    return time.perf_counter() - start, progress
+
+
+def peak_memory(db: Session, instruction: schemas.RecipeInstruction, path: pathlib.Path,
+                store: LocalObjectStore) -> int:
+    tracemalloc.start()
+    try:
+        build(db, instruction, path, store)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def list_contents(db: Session, instruction: schemas.RecipeInstruction) -> float:
+    start = time.perf_counter()
+    for kind in contents.CONTENT_KINDS.values():
+        contents.query_rows(db, instruction.tenant_uuid, kind, limit=LIST_LIMIT)
+    return time.perf_counter() - start
+
+
+def main(scales: list[str]):
+    if artifact_cache is not None:
+        print("warning: CACHE_DIR is set, repeated builds are served from the cache")
+    Base.metadata.create_all(get_engine())
+    print(f"{'scale':<8} {'seed [s]':>9} {'build [s]':>10} {'peak [MiB]':>11} {'queries':>8} "
+          f"{'S3 [MiB]':>9} {'entries':>8} {'zip [MiB]':>10} {'list [ms]':>10}")
+    with tempfile.TemporaryDirectory() as tmp, SessionLocal() as db:
+        store = LocalObjectStore(pathlib.Path(tmp) / "objects")
+        path = pathlib.Path(tmp) / "recipe.zip"
+        for name in scales:
+            generator = Generator(db, store.directory, SCALES[name])
+            start = time.perf_counter()
+            instruction = generator.generate()
+            seeded = time.perf_counter() - start
+            try:
+                seconds, progress = build(db, instruction, path, store)
+                peak = peak_memory(db, instruction, path, store)
+                listing = list_contents(db, instruction)
+                print(f"{name:<8} {seeded:>9.2f} {seconds:>10.3f} {peak / 1024 ** 2:>11.1f} "
+                      f"{progress.queries:>8} {progress.s3_bytes / 1024 ** 2:>9.1f} {progress.entries:>8} "
+                      f"{path.stat().st_size / 1024 ** 2:>10.1f} {listing * 1000:>10.1f}")
+            finally:
+                generator.cleanup()
+
+
+if __name__ == "__main__":
+    unknown = set(sys.argv[1:]) - set(SCALES)
+    if unknown:
+        print(__doc__)
+        sys.exit(1)
+    main(sys.argv[1:] or list(SCALES))
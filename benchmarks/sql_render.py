@@ -0,0 +1,105 @@
+"""SQL rendering throughput of the table-driven renderer vs the former hand-written one.
+
+Renders synthetic questionnaire events (plain rows, no database needed) to
+INSERT statements, one row per statement and in batches. The former
+renderers built a dict of f-strings per row and appended every statement to
+a growing string; `legacy_inserts` reproduces them for comparison.
+
+Usage: python benchmarks/sql_render.py [ROWS]
+"""
+import datetime
+import json
+import sys
+import time
+import uuid
+
+from typing import NamedTuple
+
+from dsw_bootstrapper import models
+from dsw_bootstrapper.sqlrender import render_inserts
+
+DEFAULT_ROWS = 1_000_000
+TENANT_PLACEHOLDER = "<<|TENANT-ID|>>"
+
+
+class Event(NamedTuple):
+    uuid: uuid.UUID
+    event_type: str
+    path: str | None
+    created_at: datetime.datetime
+    value_type: str | None
+    value: list[str] | None
+    value_id: str | None
+    value_raw: dict | None
+
+
+def events(count: int) -> list[Event]:
+    now = datetime.datetime.now(tz=datetime.UTC)
+    return [
+        Event(uuid.uuid4(), "SetReplyEvent", f"chapter.question-{i}", now, "StringReply",
+              [f"Reply {i} isn't short"], None, {"value": i} if i % 10 == 0 else None)
+        for i in range(count)
+    ]
+
+
+def _sql_str(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def legacy_inserts(questionnaire_uuid: str, rows: list[Event], batch_size: int = 1) -> str:
+    sql_script = ""
+    batch = []  # type: list[str]
+    fields_sql = ""
+    for event in rows:
+        fields = {
+            'uuid': f"'{event.uuid}'",
+            'event_type': _sql_str(event.event_type),
+            'path': _sql_str(event.path) if event.path else "NULL",
+            'created_at': f"'{event.created_at.isoformat()}'",
+            'created_by': "NULL",
+            'questionnaire_uuid': f"'{questionnaire_uuid}'",
+            'tenant_uuid': TENANT_PLACEHOLDER,
+            'value_type': _sql_str(event.value_type) if event.value_type else "NULL",
+            'value': "ARRAY[" + ", ".join(_sql_str(value) for value in event.value) + "]" if event.value else "NULL",
+            'value_id': _sql_str(event.value_id) if event.value_id else "NULL",
+            'value_raw': _sql_str(json.dumps(event.value_raw)) if event.value_raw else "NULL",
+        }
+        fields_sql = ", ".join(fields.keys())
+        batch.append("(" + ", ".join(fields.values()) + ")")
+        if len(batch) >= batch_size:
+            values_sql = ",\n".join(batch)
+            sql_script += f"INSERT INTO questionnaire_event ({fields_sql}) VALUES {values_sql};\n"
+            batch.clear()
+    if batch:
+        values_sql = ",\n".join(batch)
+        sql_script += f"INSERT INTO questionnaire_event ({fields_sql}) VALUES {values_sql};\n"
+    return sql_script
+
+
+def measure(render) -> tuple[float, int]:
+    start = time.perf_counter()
+    size = len(render())
+    return time.perf_counter() - start, size
+
+
+def main(count: int):
+    questionnaire_uuid = str(uuid.uuid4())
+    rows = events(count)
+    overrides = {
+        "tenant_uuid": TENANT_PLACEHOLDER,
+        "created_by": "NULL",
+        "questionnaire_uuid": f"'{questionnaire_uuid}'",
+    }
+    print(f"{count:,} questionnaire events")
+    print(f"  {'renderer':<28} {'batch':>6} {'time [s]':>10} {'rows/s':>12} {'size [MiB]':>11}")
+    for batch_size in (1, 1000):
+        for name, render in (
+            ("hand-written (previous)", lambda: legacy_inserts(questionnaire_uuid, rows, batch_size)),
+            ("table-driven", lambda: render_inserts(models.QuestionnaireEvent, rows, batch_size, overrides)),
+        ):
+            seconds, size = measure(render)
+            print(f"  {name:<28} {batch_size:>6} {seconds:>10.2f} {count / seconds:>12,.0f} {size / 1024 ** 2:>11.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS)
@@ -0,0 +1,61 @@
+"""Recipe build time vs archive size for different compression policies.
+
+Builds the given recipes against the configured DSW database (and S3) with
+each policy and reports the best build time of a few runs and the archive
+size. Run it without CACHE_DIR, cached entries skip compression altogether.
+
+Usage: python benchmarks/zip_compression.py RECIPE_JSON [...]
+"""
+import pathlib
+import sys
+import tempfile
+import time
+
+from dsw_bootstrapper import logic, schemas
+from dsw_bootstrapper.cache import artifact_cache
+from dsw_bootstrapper.db import SessionLocal
+
+REPEAT = 3
+
+POLICIES = {
+    "deflate everything (previous)": {"sql": "deflate", "files": "deflate"},
+    "deflate, store compressed files": {"sql": "deflate", "files": "auto"},
+    "deflate level 1": {"sql": "deflate", "sqlLevel": 1, "files": "auto"},
+    "deflate level 9": {"sql": "deflate", "sqlLevel": 9, "files": "auto"},
+    "bzip2": {"sql": "bzip2", "files": "auto"},
+    "lzma": {"sql": "lzma", "files": "auto"},
+    "store everything": {"sql": "store", "files": "store"},
+}
+
+
+def build(instruction: schemas.RecipeInstruction, path: pathlib.Path) -> float:
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        logic.build_recipe_file(instruction, db, path, logic.BuildProgress())
+        return time.perf_counter() - start
+    finally:
+        db.close()
+
+
+def main(recipe_paths: list[str]):
+    if artifact_cache is not None:
+        print("warning: CACHE_DIR is set, cached scripts are not compressed again")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = pathlib.Path(tmp) / "recipe.zip"
+        for recipe_path in recipe_paths:
+            data = pathlib.Path(recipe_path).read_text(encoding="utf-8")
+            print(f"{recipe_path}")
+            print(f"  {'policy':<34} {'time [s]':>10} {'size [B]':>14}")
+            for name, compression in POLICIES.items():
+                instruction = schemas.RecipeInstruction.model_validate_json(data)
+                instruction.compression = schemas.CompressionOptions.model_validate(compression)
+                seconds = min(build(instruction, path) for _ in range(REPEAT))
+                print(f"  {name:<34} {seconds:>10.3f} {path.stat().st_size:>14,}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    main(sys.argv[1:])
@@ -1,5 +1,13 @@
-from .app import create_app
+__all__ = ["create_app", "app"]  # pylint: disable=undefined-all-variable
 
-app = create_app()
 
-__all__ = ["create_app", "app"]
+def __getattr__(name: str):
+    # imported and created on first access (e.g. by uvicorn) rather than on
+    # import, so the CLI and render pool workers can import the package
+    # without the app, its database engines and job directory; both names are
+    # set as importing the `app` submodule would otherwise shadow the instance
+    if name in ("create_app", "app"):
+        from .app import create_app  # pylint: disable=import-outside-toplevel
+        globals().update(create_app=create_app, app=create_app())
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
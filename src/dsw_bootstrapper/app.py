@@ -1,16 +1,27 @@
 from __future__ import annotations
 
+import tempfile
+
 from pathlib import Path
+from typing import Awaitable, Callable
 from uuid import UUID
 
-from fastapi import FastAPI, Request, HTTPException, Depends
-from fastapi.responses import JSONResponse, StreamingResponse
+import pydantic_core
+
+from fastapi import FastAPI, Request, HTTPException, Depends, Query
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from .db import init_db, get_db
-from . import schemas, models, logic
+from .db import init_db, get_db, get_async_db, pool_stats
+from . import schemas, models, logic, contents
+from .cache import CachedListing, ListingCache, artifact_cache, blob_store, listing_cache
+from .jobs import recipe_jobs
+from .metrics import metrics
 
 
 ROOT_DIR = Path(__file__).parent
@@ -18,6 +29,146 @@ TEMPLATES_DIR = ROOT_DIR / "templates"
 STATIC_DIR = ROOT_DIR / "static"
 
 
+_TENANTS = TypeAdapter(list[schemas.TenantOut])
+
+
+def _recipe_filename(instr: schemas.RecipeInstruction) -> str:
+    return f"seed-{instr.name.replace(' ', '-').lower() or 'recipe'}.zip"
+
+
+def _json_response(request: Request, listing: CachedListing) -> Response:
+    # no-cache: browsers may keep the body but revalidate it with If-None-Match
+    headers = {"ETag": listing.etag, "Cache-Control": "no-cache"}
+    tags = [tag.strip().removeprefix("W/") for tag in request.headers.get("If-None-Match", "").split(",")]
+    if listing.etag in tags or "*" in tags:
+        return Response(status_code=304, headers=headers)
+    return Response(listing.body, media_type="application/json", headers=headers)
+
+
+async def _cached_listing(request: Request, key: tuple, scope: str,
+                          fingerprint: Callable[[], Awaitable[str]] | None,
+                          render: Callable[[], Awaitable[bytes]]) -> Response:
+    """JSON listing served from `listing_cache`, revalidated per scope (tenant) once its TTL passes."""
+    if listing_cache is None:
+        body = await render()
+        return _json_response(request, CachedListing(body, ListingCache.etag(body)))
+    if not listing_cache.is_fresh(scope):
+        listing_cache.check(scope, await fingerprint() if fingerprint is not None else None)
+    listing = listing_cache.get(key)
+    if listing is None:
+        listing = listing_cache.put(key, scope, await render())
+    return _json_response(request, listing)
+
+
+def _add_contents_page_route(app: FastAPI, kind_name: str, kind: contents.ContentKind):
+
+    @app.get(f"/api/tenants/{{uuid}}/contents/{kind_name}",
+             response_model=schemas.Page[kind.schema])  # type: ignore[name-defined]
+    async def tenant_contents_page(uuid: UUID, request: Request, *, q: str | None = None, cursor: str | None = None,
+                                   limit: int = Query(default=100, ge=1, le=1000),
+                                   db: AsyncSession = Depends(get_async_db)):
+        # per-kind filters (e.g. packageId) are passed as plain query parameters
+        filters = {name: value for name, value in request.query_params.items() if name in kind.filters}
+
+        async def render() -> bytes:
+            try:
+                rows, next_cursor = await contents.query_rows_async(db, uuid, kind, q=q, filters=filters,
+                                                                    cursor=cursor, limit=limit)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e)) from e
+            return pydantic_core.to_json({"items": contents.row_dicts(kind, rows), "nextCursor": next_cursor})
+
+        key = ("page", kind_name, uuid, q, cursor, limit, tuple(sorted(filters.items())))
+        return await _cached_listing(request, key, str(uuid), lambda: contents.fingerprint_async(db, uuid), render)
+
+
+def _add_tenant_routes(app: FastAPI):
+
+    @app.get("/api/tenants", response_model=list[schemas.TenantOut])
+    async def list_tenants(request: Request, db: AsyncSession = Depends(get_async_db)):
+        # few rows without timestamps: simply listed again once the TTL passes
+        async def render() -> bytes:
+            return _TENANTS.dump_json([
+                schemas.TenantOut.model_validate(tenant, from_attributes=True, by_alias=False, by_name=True)
+                for tenant in (await db.scalars(select(models.Tenant))).all()
+            ], by_alias=True)
+
+        return await _cached_listing(request, ("tenants",), "", None, render)
+
+    @app.get("/api/tenants/{uuid}/contents", response_model=schemas.TenantContents)
+    async def tenant_contents(uuid: UUID, request: Request, db: AsyncSession = Depends(get_async_db)):
+        async def render() -> bytes:
+            # content kinds are named like the `TenantContents` fields (aliases)
+            return pydantic_core.to_json({
+                name: contents.row_dicts(kind, (await contents.query_rows_async(db, uuid, kind))[0])
+                for name, kind in contents.CONTENT_KINDS.items()
+            })
+
+        return await _cached_listing(request, ("contents", uuid), str(uuid),
+                                     lambda: contents.fingerprint_async(db, uuid), render)
+
+
+def _add_cache_routes(app: FastAPI):
+
+    @app.get("/api/cache")
+    async def cache_stats():
+        listings = listing_cache.stats() if listing_cache is not None else None
+        if artifact_cache is None or blob_store is None:
+            return JSONResponse({"enabled": False, "listings": listings})
+        return JSONResponse({
+            "enabled": True,
+            "artifacts": artifact_cache.stats(),
+            "s3": blob_store.stats(),
+            "listings": listings,
+        })
+
+    @app.delete("/api/cache/listings")
+    async def invalidate_listings(tenant: UUID | None = None):
+        # e.g. after changes the change detection misses, such as renamed tenants
+        if listing_cache is None:
+            return JSONResponse({"invalidated": 0})
+        return JSONResponse({"invalidated": listing_cache.invalidate(str(tenant) if tenant else None)})
+
+
+def _add_recipe_manifest_route(app: FastAPI):
+
+    @app.post("/api/recipe/manifest", response_model=schemas.RecipeManifest)
+    async def recipe_manifest(request: Request):
+        # the prior recipe ZIP is the raw request body, spooled to disk if large
+        with tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024) as f:
+            async for chunk in request.stream():
+                f.write(chunk)
+            try:
+                return logic.read_recipe_manifest(f)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e)) from e
+
+
+def _add_recipe_job_routes(app: FastAPI):
+
+    @app.post("/api/recipe/jobs", response_model=schemas.RecipeJobOut, status_code=202)
+    async def submit_recipe_job(instr: schemas.RecipeInstruction):
+        return recipe_jobs.submit(instr).to_schema()
+
+    @app.get("/api/recipe/jobs/{job_id}", response_model=schemas.RecipeJobOut)
+    async def get_recipe_job(job_id: UUID):
+        job = recipe_jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found or expired")
+        return job.to_schema()
+
+    @app.get("/api/recipe/jobs/{job_id}/download")
+    async def download_recipe_job(job_id: UUID):
+        job = recipe_jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found or expired")
+        if job.status != "done":
+            raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+        headers = {"Server-Timing": job.progress.server_timing()}
+        return FileResponse(job.path, media_type="application/zip", filename=_recipe_filename(job.instruction),
+                            headers=headers)
+
+
 def create_app() -> FastAPI:
     app = FastAPI(title="DSW Seeder Recipe Builder")
 
@@ -30,59 +181,38 @@ def create_app() -> FastAPI:
     async def index(request: Request):
         return templates.TemplateResponse("index.html.j2", {"request": request})
 
-    @app.get("/api/tenants", response_model=list[schemas.TenantOut])
-    async def list_tenants(db: Session = Depends(get_db)):
-        return [
-            schemas.TenantOut.model_validate(tenant, from_attributes=True, by_alias=False, by_name=True)
-            for tenant in db.query(models.Tenant).all()
-        ]
-
-    @app.get("/api/tenants/{uuid}/contents", response_model=schemas.TenantContents)
-    async def tenant_contents(uuid: UUID, db: Session = Depends(get_db)):
-        packages = db.query(models.Package).filter(
-            models.Package.tenant_uuid == uuid,
-        ).all()
-        document_templates = db.query(models.DocumentTemplate).filter(
-            models.DocumentTemplate.tenant_uuid == uuid,
-            models.DocumentTemplate.phase == 'ReleasedDocumentTemplatePhase',
-        ).all()
-        questionnaires = db.query(models.Questionnaire).filter(
-            models.Questionnaire.tenant_uuid == uuid,
-        ).all()
-        documents = db.query(models.Document).filter(
-            models.Document.tenant_uuid == uuid,
-            models.Document.state == 'DoneDocumentState',
-            models.Document.durability == 'PersistentDocumentDurability',
-        ).all()
-        contents = schemas.TenantContents(
-            packages=[
-                schemas.PackageOut.model_validate(pkg, from_attributes=True, by_alias=False, by_name=True)
-                for pkg in packages
-            ],
-            documentTemplates=[
-                schemas.DocumentTemplateOut.model_validate(dt, from_attributes=True, by_alias=False, by_name=True)
-                for dt in document_templates
-            ],
-            questionnaires=[
-                schemas.QuestionnaireOut.model_validate(qtn, from_attributes=True, by_alias=False, by_name=True)
-                for qtn in questionnaires
-            ],
-            documents=[
-                schemas.DocumentOut.model_validate(doc, from_attributes=True, by_alias=False, by_name=True)
-                for doc in documents
-            ],
-        )
-        if not contents:
-            raise HTTPException(status_code=404, detail="Tenant not found or no contents")
-        return contents
-
     @app.post("/api/recipe")
-    async def build_recipe(instr: schemas.RecipeInstruction, db: Session = Depends(get_db)):
-        data = logic.build_recipe(instr, db)
-
-        filename = f"seed-{instr.name.replace(' ', '-').lower() or 'recipe'}.zip"
-        headers = {"Content-Disposition": f"attachment; filename={filename}"}
-        return StreamingResponse(iter([data]), media_type="application/zip", headers=headers)
+    def build_recipe(instr: schemas.RecipeInstruction, db: Session = Depends(get_db)):
+        # sync endpoint: planning queries run in the threadpool, not the event loop
+        progress = logic.BuildProgress()
+        try:
+            chunks = logic.build_recipe(instr, db, progress)
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e)) from e
+
+        # headers precede the streamed archive, so only planning is summarized
+        headers = {
+            "Content-Disposition": f"attachment; filename={_recipe_filename(instr)}",
+            "Server-Timing": progress.server_timing(),
+            "X-Recipe-Queries": str(progress.queries),
+            "X-Recipe-Rows": str(progress.rows),
+        }
+        return StreamingResponse(chunks, media_type="application/zip", headers=headers)
+
+    _add_tenant_routes(app)
+    for kind_name, kind in contents.CONTENT_KINDS.items():
+        _add_contents_page_route(app, kind_name, kind)
+    _add_recipe_manifest_route(app)
+    _add_recipe_job_routes(app)
+    _add_cache_routes(app)
+
+    @app.get("/api/db")
+    async def db_stats():
+        return JSONResponse(pool_stats())
+
+    @app.get("/metrics")
+    async def prometheus_metrics():
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
     # Friendly health endpoint
     @app.get("/health")
@@ -0,0 +1,295 @@
+import collections
+import hashlib
+import json
+import mmap
+import os
+import pathlib
+import tempfile
+import threading
+import time
+
+from typing import NamedTuple
+
+from .config import Config
+
+
+class ArtifactCache:
+    """Size-bounded on-disk LRU cache of rendered recipe artifacts.
+
+    Entries are immutable blobs addressed by a key derived from the entity
+    they were rendered from (tenant, id and timestamp), so a changed entity
+    simply gets a new key and the stale entry ages out. Every `put` is
+    counted as a miss as it means the artifact had to be produced again.
+    """
+
+    def __init__(self, directory: str | pathlib.Path, max_bytes: int):
+        self.directory = pathlib.Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()  # type: collections.OrderedDict[str, int]
+        self._size = 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def key(*parts: object) -> str:
+        return hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.directory / key[:2] / key
+
+    def _load_index(self):
+        files = [path for path in self.directory.glob("*/*") if path.is_file() and not path.name.startswith(".")]
+        for path in sorted(files, key=lambda p: p.stat().st_mtime):
+            size = path.stat().st_size
+            self._entries[path.name] = size
+            self._size += size
+        self._evict()
+
+    def _evict(self):
+        while self._size > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._size -= size
+            self.evictions += 1
+            self._path(key).unlink(missing_ok=True)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+        try:
+            path = self._path(key)
+            data = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            # evicted by a concurrent put in the meantime
+            with self._lock:
+                self._size -= self._entries.pop(key, 0)
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def view(self, key: str) -> mmap.mmap | bytes | None:
+        """Like :meth:`get` but memory-maps the entry instead of reading it."""
+        with self._lock:
+            size = self._entries.get(key)
+            if size is None:
+                return None
+            self._entries.move_to_end(key)
+        try:
+            path = self._path(key)
+            with path.open("rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._size -= self._entries.pop(key, 0)
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes | memoryview):
+        with self._lock:
+            self.misses += 1
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=path.parent, prefix=".", delete=False) as tmp:
+            tmp.write(data)
+        os.replace(tmp.name, path)
+        with self._lock:
+            self._size -= self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self._size += len(data)
+            self._evict()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class BlobStore:
+    """Content-addressed on-disk store of S3 objects.
+
+    Blobs are keyed by their sha256, so the same content shared by several
+    objects (e.g. assets of template versions) is stored once. A small ref
+    per object links its name to the blob together with the ETag it was
+    downloaded with and an optional caller-provided version (such as the
+    `updated_at` of an immutable asset) that allows skipping ETag checks.
+    """
+
+    def __init__(self, directory: str | pathlib.Path, max_bytes: int):
+        self.directory = pathlib.Path(directory)
+        self.blobs = ArtifactCache(self.directory / "blobs", max_bytes)
+        self.refs_dir = self.directory / "refs"
+        self.refs_dir.mkdir(parents=True, exist_ok=True)
+
+    def _ref_path(self, object_name: str) -> pathlib.Path:
+        return self.refs_dir / f"{ArtifactCache.key(object_name)}.json"
+
+    def _read_ref(self, object_name: str) -> dict | None:
+        try:
+            return json.loads(self._ref_path(object_name).read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_ref(self, object_name: str, ref: dict):
+        path = self._ref_path(object_name)
+        with tempfile.NamedTemporaryFile("w", dir=self.refs_dir, prefix=".", delete=False) as tmp:
+            json.dump(ref, tmp)
+        os.replace(tmp.name, path)
+
+    def open(self, object_name: str, etag: str | None = None,
+             version: str | None = None) -> mmap.mmap | bytes | None:
+        """Return the cached content if it matches the `etag` or `version`."""
+        ref = self._read_ref(object_name)
+        if ref is None:
+            return None
+        if etag is not None:
+            if ref["etag"] != etag:
+                return None
+            if version is not None and ref.get("version") != version:
+                ref["version"] = version
+                self._write_ref(object_name, ref)
+        elif version is None or ref.get("version") != version:
+            return None
+        return self.blobs.view(ref["sha256"])
+
+    def store(self, object_name: str, data: bytes, etag: str, version: str | None = None):
+        digest = hashlib.sha256(data).hexdigest()
+        if digest not in self.blobs:
+            self.blobs.put(digest, data)
+        self._write_ref(object_name, {
+            "sha256": digest,
+            "etag": etag,
+            "version": version,
+            "size": len(data),
+        })
+
+    def stats(self) -> dict[str, int]:
+        return self.blobs.stats()
+
+
+class CachedListing(NamedTuple):
+    body: bytes
+    etag: str
+
+
+class ListingCache:
+    """In-memory LRU cache of rendered JSON listings, scoped per tenant.
+
+    A scope (a tenant, or "" for tenant-independent listings) is considered
+    fresh for `ttl` seconds after `check`, which is given a cheap change
+    fingerprint of the scope; entries of a scope are dropped when it changes
+    (or when no fingerprint can be given), otherwise they are kept for
+    another `ttl` without re-running the listing queries.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()  # type: collections.OrderedDict[tuple, tuple[str, CachedListing]]
+        self._checks = {}  # type: dict[str, tuple[str | None, float]]
+
+    @staticmethod
+    def etag(body: bytes) -> str:
+        return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+    def is_fresh(self, scope: str) -> bool:
+        with self._lock:
+            check = self._checks.get(scope)
+            return check is not None and time.monotonic() - check[1] < self.ttl
+
+    def check(self, scope: str, fingerprint: str | None):
+        with self._lock:
+            previous = self._checks.get(scope)
+            if fingerprint is not None and previous is not None and previous[0] == fingerprint:
+                self.revalidations += 1
+            else:
+                self._drop(scope)
+            self._checks[scope] = (fingerprint, time.monotonic())
+
+    def get(self, key: tuple) -> CachedListing | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: tuple, scope: str, body: bytes) -> CachedListing:
+        listing = CachedListing(body, self.etag(body))
+        with self._lock:
+            self._entries[key] = (scope, listing)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return listing
+
+    def invalidate(self, scope: str | None = None) -> int:
+        """Drop the entries of `scope` (all if not given), returning how many."""
+        with self._lock:
+            if scope is None:
+                count = len(self._entries)
+                self._entries.clear()
+                self._checks.clear()
+                return count
+            self._checks.pop(scope, None)
+            return self._drop(scope)
+
+    def _drop(self, scope: str) -> int:
+        keys = [key for key, (entry_scope, _) in self._entries.items() if entry_scope == scope]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def stats(self) -> dict[str, int | float]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidations": self.revalidations,
+            }
+
+
+artifact_cache = ArtifactCache(
+    directory=pathlib.Path(Config.CACHE_DIR) / "artifacts",
+    max_bytes=Config.CACHE_MAX_BYTES,
+) if Config.CACHE_DIR else None
+
+blob_store = BlobStore(
+    directory=pathlib.Path(Config.CACHE_DIR) / "s3",
+    max_bytes=Config.BLOB_CACHE_MAX_BYTES,
+) if Config.CACHE_DIR else None
+
+listing_cache = ListingCache(
+    ttl=Config.LISTING_CACHE_TTL,
+    max_entries=Config.LISTING_CACHE_ENTRIES,
+) if Config.LISTING_CACHE_TTL > 0 else None
@@ -0,0 +1,125 @@
+import argparse
+import concurrent.futures
+import pathlib
+import sys
+import time
+import uuid
+
+from typing import NamedTuple
+
+from sqlalchemy import or_, select
+
+from . import logic, models, schemas
+from .db import SessionLocal
+from .snapshot import Snapshot
+
+
+def _tenant_uuids(db, tenants: list[str]) -> list[uuid.UUID]:
+    # tenants given by UUID or tenant ID
+    result = []
+    for tenant in tenants:
+        try:
+            condition = or_(models.Tenant.uuid == uuid.UUID(tenant), models.Tenant.tenant_id == tenant)
+        except ValueError:
+            condition = models.Tenant.tenant_id == tenant
+        tenant_uuid = db.scalar(select(models.Tenant.uuid).where(condition))
+        if tenant_uuid is None:
+            raise SystemExit(f"Unknown tenant: {tenant}")
+        result.append(tenant_uuid)
+    return result
+
+
+def run_snapshot(args: argparse.Namespace):
+    start = time.perf_counter()
+    with SessionLocal() as db:
+        tenant_uuids = _tenant_uuids(db, args.tenant)
+        Snapshot(args.directory).dump(db, tenant_uuids)
+    print(f"Snapshot of {len(tenant_uuids)} tenant(s) in {args.directory} took {time.perf_counter() - start:.1f}s")
+
+
+class BuildResult(NamedTuple):
+    source: pathlib.Path
+    target: pathlib.Path
+    seconds: float
+    progress: logic.BuildProgress
+    error: str | None
+
+
+def _build_one(source: pathlib.Path, target: pathlib.Path, snapshot: Snapshot | None) -> BuildResult:
+    # runs on a worker thread; sessions come from the shared pool (or the
+    # snapshot) and S3 clients and entity caches are process-wide
+    progress = logic.BuildProgress()
+    start = time.perf_counter()
+    try:
+        instruction = schemas.RecipeInstruction.model_validate_json(source.read_bytes())
+        with snapshot.session() if snapshot is not None else SessionLocal() as db:
+            logic.build_recipe_file(
+                instruction, db, target, progress,
+                s3_client=snapshot.object_store() if snapshot is not None else None,
+            )
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        target.unlink(missing_ok=True)
+        print(f"{source}: {e}", file=sys.stderr)
+        return BuildResult(source, target, time.perf_counter() - start, progress, f"{type(e).__name__}: {str(e).splitlines()[0]}")
+    return BuildResult(source, target, time.perf_counter() - start, progress, None)
+
+
+def _print_summary(results: list[BuildResult], seconds: float):
+    width = max([len(result.source.name) for result in results] + [6])
+    print(f"{'recipe':<{width}} {'time [s]':>9} {'queries':>8} {'rows':>8} {'S3 [MiB]':>9} {'entries':>8} {'zip [MiB]':>10}")
+    for result in results:
+        if result.error is not None:
+            print(f"{result.source.name:<{width}} {result.seconds:>9.2f}  FAILED {result.error}")
+            continue
+        print(f"{result.source.name:<{width}} {result.seconds:>9.2f} {result.progress.queries:>8} "
+              f"{result.progress.rows:>8} {result.progress.s3_bytes / 1024 ** 2:>9.1f} "
+              f"{result.progress.entries:>8} {result.target.stat().st_size / 1024 ** 2:>10.1f}")
+    built = [result for result in results if result.error is None]
+    size = sum(result.target.stat().st_size for result in built)
+    print(f"{len(built)} of {len(results)} recipes built in {seconds:.2f}s, {size / 1024 ** 2:.1f} MiB written")
+
+
+def run_build(args: argparse.Namespace):
+    sources = [pathlib.Path(source) for source in args.instructions]
+    output = pathlib.Path(args.output)
+    targets = [output / f"{source.stem}.zip" for source in sources]
+    if len(set(targets)) != len(targets):
+        raise SystemExit("Instruction files must have distinct names, archives are named after them")
+    snapshot = Snapshot(args.snapshot) if args.snapshot else None
+    if snapshot is not None and not snapshot.exists():
+        raise SystemExit(f"No snapshot in {args.snapshot}")
+    output.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.jobs, thread_name_prefix="recipe-build") as executor:
+        results = list(executor.map(_build_one, sources, targets, [snapshot] * len(sources)))
+    _print_summary(results, time.perf_counter() - start)
+    if any(result.error is not None for result in results):
+        raise SystemExit(1)
+
+
+def parser() -> argparse.ArgumentParser:
+    result = argparse.ArgumentParser(prog="dsw-bootstrapper", description="DSW Bootstrapper for building seed recipes")
+    commands = result.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("snapshot", help="copy tenants from the DSW database and S3 into a local snapshot")
+    command.add_argument("directory", help="snapshot directory (created or updated)")
+    command.add_argument("-t", "--tenant", action="append", required=True,
+                         help="UUID or ID of a tenant to include (repeatable)")
+    command.set_defaults(run=run_snapshot)
+
+    command = commands.add_parser("build", help="build recipe archives from instruction JSON files")
+    command.add_argument("instructions", nargs="+", help="recipe instruction files (as posted to /api/recipe)")
+    command.add_argument("-o", "--output", default=".", help="directory for the archives, named after the files")
+    command.add_argument("-j", "--jobs", type=int, default=1, help="recipes built in parallel")
+    command.add_argument("-s", "--snapshot", help="build from this snapshot instead of the DSW database and S3")
+    command.set_defaults(run=run_build)
+    return result
+
+
+def main(argv: list[str] | None = None):
+    args = parser().parse_args(argv)
+    args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
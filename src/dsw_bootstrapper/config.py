@@ -1,15 +1,49 @@
 import os
+import tempfile
+
 import dotenv
 
+from sqlalchemy.engine import make_url
+
 dotenv.load_dotenv()
 
 
+def _async_database_url(url: str) -> str:
+    # same database through asyncpg, e.g. postgresql://... -> postgresql+asyncpg://...
+    if not url:
+        return ""
+    return make_url(url).set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+
+
 class Config:
 
     DEBUG: bool = os.getenv("DEBUG", "False").lower() in ("true", "1", "t")
     DATABASE_URL: str = os.getenv("DATABASE_URL", "")
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", _async_database_url(DATABASE_URL))
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "True").lower() in ("true", "1", "t")
+    DB_QUERY_CACHE_SIZE: int = int(os.getenv("DB_QUERY_CACHE_SIZE", "500"))
     S3_URL: str = os.getenv("S3_URL", "")
     S3_ACCESS_KEY: str = os.getenv("S3_ACCESS_KEY", "")
     S3_SECRET_KEY: str = os.getenv("S3_SECRET_KEY", "")
     S3_BUCKET: str = os.getenv("S3_BUCKET", "")
     S3_REGION: str = os.getenv("S3_REGION", "eu-central-1")
+    S3_CONCURRENCY: int = int(os.getenv("S3_CONCURRENCY", "8"))
+    S3_POOL_SIZE: int = int(os.getenv("S3_POOL_SIZE", "16"))
+    S3_CONNECT_TIMEOUT: float = float(os.getenv("S3_CONNECT_TIMEOUT", "10"))
+    S3_READ_TIMEOUT: float = float(os.getenv("S3_READ_TIMEOUT", "300"))
+    S3_RETRIES: int = int(os.getenv("S3_RETRIES", "5"))
+    S3_RETRY_BACKOFF: float = float(os.getenv("S3_RETRY_BACKOFF", "0.2"))
+    S3_STREAM_THRESHOLD: int = int(os.getenv("S3_STREAM_THRESHOLD", str(32 * 1024 ** 2)))
+    RENDER_WORKERS: int = int(os.getenv("RENDER_WORKERS", "0"))
+    CACHE_DIR: str = os.getenv("CACHE_DIR", "")
+    CACHE_MAX_BYTES: int = int(os.getenv("CACHE_MAX_BYTES", str(1024 ** 3)))
+    BLOB_CACHE_MAX_BYTES: int = int(os.getenv("BLOB_CACHE_MAX_BYTES", str(10 * 1024 ** 3)))
+    LISTING_CACHE_TTL: float = float(os.getenv("LISTING_CACHE_TTL", "60"))
+    LISTING_CACHE_ENTRIES: int = int(os.getenv("LISTING_CACHE_ENTRIES", "1000"))
+    JOB_DIR: str = os.getenv("JOB_DIR", os.path.join(tempfile.gettempdir(), "dsw-bootstrapper-jobs"))
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "2"))
+    JOB_TTL: int = int(os.getenv("JOB_TTL", "3600"))
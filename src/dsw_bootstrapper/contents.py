@@ -0,0 +1,202 @@
+import base64
+import json
+import uuid
+
+from typing import Any, Iterable, NamedTuple
+
+from pydantic import BaseModel
+from sqlalchemy import ColumnElement, Row, Select, String, func, literal, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute, Session
+
+from . import models, schemas
+
+
+class ContentKind(NamedTuple):
+    schema: type[BaseModel]
+    key: InstrumentedAttribute
+    columns: list[InstrumentedAttribute]
+    conditions: list[ColumnElement[bool]]
+    filters: dict[str, InstrumentedAttribute]
+
+
+# only the columns needed for the *Out schemas are selected (never events,
+# readme and similar heavy columns), ordered by name for keyset pagination
+CONTENT_KINDS = {
+    "packages": ContentKind(
+        schema=schemas.PackageOut,
+        key=models.Package.id,
+        columns=[
+            models.Package.id,
+            models.Package.name,
+            models.Package.previous_package_id,
+            models.Package.fork_of_package_id,
+            models.Package.merge_checkpoint_package_id,
+        ],
+        conditions=[],
+        filters={
+            "organizationId": models.Package.organization_id,
+            "kmId": models.Package.km_id,
+        },
+    ),
+    "documentTemplates": ContentKind(
+        schema=schemas.DocumentTemplateOut,
+        key=models.DocumentTemplate.id,
+        columns=[
+            models.DocumentTemplate.id,
+            models.DocumentTemplate.name,
+        ],
+        conditions=[
+            models.DocumentTemplate.phase == 'ReleasedDocumentTemplatePhase',
+        ],
+        filters={
+            "organizationId": models.DocumentTemplate.organization_id,
+            "templateId": models.DocumentTemplate.template_id,
+        },
+    ),
+    "questionnaires": ContentKind(
+        schema=schemas.QuestionnaireOut,
+        key=models.Questionnaire.uuid,
+        columns=[
+            models.Questionnaire.uuid,
+            models.Questionnaire.name,
+            models.Questionnaire.package_id,
+            models.Questionnaire.document_template_id,
+            models.Questionnaire.format_uuid,
+        ],
+        conditions=[],
+        filters={
+            "packageId": models.Questionnaire.package_id,
+            "documentTemplateId": models.Questionnaire.document_template_id,
+        },
+    ),
+    "documents": ContentKind(
+        schema=schemas.DocumentOut,
+        key=models.Document.uuid,
+        columns=[
+            models.Document.uuid,
+            models.Document.name,
+            models.Document.questionnaire_uuid,
+            models.Document.document_template_id,
+            models.Document.format_uuid,
+            models.Document.file_name,
+        ],
+        conditions=[
+            models.Document.state == 'DoneDocumentState',
+            models.Document.durability == 'PersistentDocumentDurability',
+        ],
+        filters={
+            "questionnaireUuid": models.Document.questionnaire_uuid,
+            "documentTemplateId": models.Document.document_template_id,
+        },
+    ),
+}
+
+
+def _aliases(kind: ContentKind) -> list[str]:
+    # JSON keys of the schema fields, in the order of the selected columns
+    fields = kind.schema.model_fields
+    keys = [column.key for column in kind.columns]
+    if set(keys) != set(fields):
+        raise TypeError(f"Columns of {kind.schema.__name__} do not match its fields: {keys}")
+    return [fields[key].alias or key for key in keys]
+
+
+_ALIASES = {kind.schema: _aliases(kind) for kind in CONTENT_KINDS.values()}
+
+
+def row_dicts(kind: ContentKind, rows: Iterable[Row]) -> list[dict[str, Any]]:
+    """Rows as dicts shaped like the JSON of `kind.schema`, without validating each row.
+
+    The rows come from typed columns, so they can be serialized as they are
+    (e.g. with `pydantic_core.to_json`) instead of being validated into
+    schema instances first.
+    """
+    aliases = _ALIASES[kind.schema]
+    return [dict(zip(aliases, row)) for row in rows]
+
+
+def _encode_cursor(row: Row) -> str:
+    data = json.dumps([row.name, str(row[0])]).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except ValueError as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(decoded, list) or len(decoded) != 2:
+        raise ValueError("Invalid cursor")
+    name, key = decoded
+    return str(name), str(key)
+
+
+def _parse(column: InstrumentedAttribute, value: str):
+    # raises ValueError for malformed values (e.g. UUIDs)
+    return column.type.python_type(value)
+
+
+def _select_rows(tenant_uuid: uuid.UUID, kind: ContentKind, *, q: str | None,
+                 filters: dict[str, str] | None, cursor: str | None, limit: int | None) -> Select:
+    model = kind.key.class_
+    query = select(*kind.columns).where(
+        model.tenant_uuid == tenant_uuid,
+        *kind.conditions,
+    )
+    if q:
+        # matched literally, % and _ are not wildcards in searches
+        pattern = "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        query = query.where(or_(model.name.ilike(pattern, escape="\\"),
+                                kind.key.cast(String).ilike(pattern, escape="\\")))
+    for name, value in (filters or {}).items():
+        column = kind.filters[name]
+        query = query.where(column == _parse(column, value))
+    if cursor:
+        name, key = _decode_cursor(cursor)
+        query = query.where(tuple_(model.name, kind.key) > tuple_(literal(name), literal(_parse(kind.key, key))))
+    query = query.order_by(model.name, kind.key)
+    if limit is not None:
+        # one extra row tells whether there is a next page
+        query = query.limit(limit + 1)
+    return query
+
+
+def _paginate(rows: list[Row], limit: int | None) -> tuple[list[Row], str | None]:
+    if limit is not None and len(rows) > limit:
+        return rows[:limit], _encode_cursor(rows[limit - 1])
+    return rows, None
+
+
+def query_rows(db: Session, tenant_uuid: uuid.UUID, kind: ContentKind, *, q: str | None = None,
+               filters: dict[str, str] | None = None, cursor: str | None = None,
+               limit: int | None = None) -> tuple[list[Row], str | None]:
+    """Select one page of content rows (all rows if `limit` is not set)."""
+    query = _select_rows(tenant_uuid, kind, q=q, filters=filters, cursor=cursor, limit=limit)
+    return _paginate(list(db.execute(query)), limit)
+
+
+async def query_rows_async(db: AsyncSession, tenant_uuid: uuid.UUID, kind: ContentKind, *, q: str | None = None,
+                           filters: dict[str, str] | None = None, cursor: str | None = None,
+                           limit: int | None = None) -> tuple[list[Row], str | None]:
+    """Like :func:`query_rows`, on an async session."""
+    query = _select_rows(tenant_uuid, kind, q=q, filters=filters, cursor=cursor, limit=limit)
+    return _paginate(list(await db.execute(query)), limit)
+
+
+def _select_fingerprint(tenant_uuid: uuid.UUID) -> Select:
+    # row count and latest change per content kind, one indexed scan each;
+    # deleted rows show in the count, added or updated ones in the timestamp
+    values = []
+    for kind in CONTENT_KINDS.values():
+        model = kind.key.class_
+        changed = getattr(model, "updated_at", model.created_at)
+        where = (model.tenant_uuid == tenant_uuid, *kind.conditions)
+        values.append(select(func.count()).select_from(model).where(*where).scalar_subquery())  # pylint: disable=not-callable
+        values.append(select(func.max(changed)).where(*where).scalar_subquery())
+    return select(*values)
+
+
+async def fingerprint_async(db: AsyncSession, tenant_uuid: uuid.UUID) -> str:
+    """Cheap summary of the tenant contents that changes whenever the listings do."""
+    return json.dumps([str(value) for value in (await db.execute(_select_fingerprint(tenant_uuid))).one()])
@@ -1,5 +1,13 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+import datetime
+import functools
+import threading
+import time
+
+from sqlalchemy import DateTime, Engine, create_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.types import TypeDecorator
 
 from .config import Config
 
@@ -9,20 +17,141 @@ class Base(DeclarativeBase):
     pass
 
 
-# --- Engine & session factory ---
-engine = create_engine(
-    Config.DATABASE_URL,
-    echo=False,
-    future=True,
-)
+class Timestamp(TypeDecorator):  # pylint: disable=abstract-method, too-many-ancestors
+    """`timestamptz` that stays timezone-aware on databases without one (snapshots).
+
+    SQLite stores datetimes without an offset, so values are written in UTC
+    and read back as UTC; PostgreSQL is left untouched.
+    """
+
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and dialect.name == "sqlite":
+            value = value.astimezone(datetime.UTC)
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is not None and value.tzinfo is None:
+            value = value.replace(tzinfo=datetime.UTC)
+        return value
+
+
+# --- Connection pools with checkout wait times ---
+class PoolStats:
+    """How long checkouts waited for a pooled connection (incl. connecting)."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def to_dict(self, pool: QueuePool) -> dict[str, int | float]:
+        with self._lock:
+            return {
+                "size": pool.size(),
+                "checkedOut": pool.checkedout(),
+                # SQLAlchemy counts connections - pool_size, negative below pool_size
+                "overflow": max(0, pool.overflow()),
+                "checkouts": self.checkouts,
+                "waitSeconds": self.wait_seconds,
+                "maxWaitSeconds": self.max_wait_seconds,
+            }
+
+
+class TimedQueuePool(QueuePool):
+    stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.stats.add(time.perf_counter() - start)
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.stats.add(time.perf_counter() - start)
+
 
-SessionLocal = sessionmaker(
-    bind=engine,
-    autoflush=False,
-    autocommit=False,
-    expire_on_commit=False,
-    future=True,
-)
+_POOL_OPTIONS = {
+    "pool_size": Config.DB_POOL_SIZE,
+    "max_overflow": Config.DB_MAX_OVERFLOW,
+    "pool_timeout": Config.DB_POOL_TIMEOUT,
+    "pool_recycle": Config.DB_POOL_RECYCLE,
+    "pool_pre_ping": Config.DB_POOL_PRE_PING,
+    "query_cache_size": Config.DB_QUERY_CACHE_SIZE,
+}
+
+
+# --- Engines & session factories ---
+# created on first use, so the package imports without a database (offline
+# snapshot builds, render pool workers)
+@functools.cache
+def get_engine() -> Engine:
+    return create_engine(
+        Config.DATABASE_URL,
+        echo=False,
+        future=True,
+        poolclass=TimedQueuePool,
+        **_POOL_OPTIONS,
+    )
+
+
+@functools.cache
+def _session_factory() -> sessionmaker:
+    return sessionmaker(
+        bind=get_engine(),
+        autoflush=False,
+        autocommit=False,
+        expire_on_commit=False,
+        future=True,
+    )
+
+
+def SessionLocal() -> Session:  # pylint: disable=invalid-name
+    return _session_factory()()
+
+
+# --- Async engine & session factory (for async endpoints) ---
+@functools.cache
+def get_async_engine() -> AsyncEngine:
+    return create_async_engine(
+        Config.ASYNC_DATABASE_URL,
+        echo=False,
+        poolclass=TimedAsyncQueuePool,
+        # asyncpg prepares statements server-side and reuses them per
+        # connection with its own statement cache (default size 100)
+        **_POOL_OPTIONS,
+    )
+
+
+@functools.cache
+def _async_session_factory() -> async_sessionmaker:
+    return async_sessionmaker(
+        bind=get_async_engine(),
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
+
+def AsyncSessionLocal() -> AsyncSession:  # pylint: disable=invalid-name
+    return _async_session_factory()()
 
 
 # --- Dependency for FastAPI ---
@@ -34,10 +163,22 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def pool_stats() -> dict[str, dict[str, int | float]]:
+    return {
+        "sync": TimedQueuePool.stats.to_dict(get_engine().pool),  # type: ignore[arg-type]
+        "async": TimedAsyncQueuePool.stats.to_dict(get_async_engine().pool),  # type: ignore[arg-type]
+    }
+
+
 # --- Utility: init tables ---
 def init_db():
     """Create tables if they don't exist (for dev/demo)."""
     # pylint: disable-next=import-outside-toplevel, cyclic-import
     import dsw_bootstrapper.models
     print(f"Loaded: {dsw_bootstrapper.models}")
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=get_engine())
@@ -0,0 +1,112 @@
+import concurrent.futures
+import datetime
+import pathlib
+import threading
+import uuid
+
+from . import logic, schemas
+from .config import Config
+from .db import SessionLocal
+
+
+class RecipeJob:
+
+    def __init__(self, instruction: schemas.RecipeInstruction, path: pathlib.Path):
+        self.id = uuid.uuid4()
+        self.instruction = instruction
+        self.path = path
+        self.status = "queued"  # type: schemas.JobStatus
+        self.error = None  # type: str | None
+        self.progress = logic.BuildProgress()
+        self.created_at = datetime.datetime.now(tz=datetime.UTC)
+        self.finished_at = None  # type: datetime.datetime | None
+
+    @property
+    def expires_at(self) -> datetime.datetime | None:
+        if self.finished_at is None:
+            return None
+        return self.finished_at + datetime.timedelta(seconds=Config.JOB_TTL)
+
+    def to_schema(self) -> schemas.RecipeJobOut:
+        return schemas.RecipeJobOut(
+            id=self.id,
+            status=self.status,
+            error=self.error,
+            progress=schemas.RecipeJobProgress(
+                phase=self.progress.phase,
+                queries=self.progress.queries,
+                rows=self.progress.rows,
+                s3Bytes=self.progress.s3_bytes,
+                entries=self.progress.entries,
+                timings=dict(self.progress.timings),
+            ),
+            createdAt=self.created_at,
+            finishedAt=self.finished_at,
+            expiresAt=self.expires_at,
+        )
+
+
+class RecipeJobs:
+    """Recipe builds running on a worker pool with archives spooled to disk.
+
+    Finished jobs (and their archives) are dropped `JOB_TTL` seconds after
+    they finish; expired jobs are purged whenever jobs are submitted or read.
+    """
+
+    def __init__(self, directory: str | pathlib.Path, workers: int):
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._jobs = {}  # type: dict[uuid.UUID, RecipeJob]
+        self._lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="recipe-job",
+        )
+
+    def submit(self, instruction: schemas.RecipeInstruction) -> RecipeJob:
+        self.purge_expired()
+        job = RecipeJob(instruction, self.directory / f"{uuid.uuid4()}.zip")
+        with self._lock:
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: uuid.UUID) -> RecipeJob | None:
+        self.purge_expired()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def purge_expired(self):
+        now = datetime.datetime.now(tz=datetime.UTC)
+        with self._lock:
+            expired = [
+                job for job in self._jobs.values()
+                if job.expires_at is not None and job.expires_at <= now
+            ]
+            for job in expired:
+                del self._jobs[job.id]
+        for job in expired:
+            job.path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _run(job: RecipeJob):
+        job.status = "running"
+        db = SessionLocal()
+        try:
+            logic.build_recipe_file(job.instruction, db, job.path, job.progress)
+            job.status = "done"
+            job.progress.phase = "done"
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            job.status = "failed"
+            job.progress.phase = "failed"
+            job.error = str(e)
+            job.path.unlink(missing_ok=True)
+        finally:
+            db.close()
+            job.finished_at = datetime.datetime.now(tz=datetime.UTC)
+
+
+recipe_jobs = RecipeJobs(
+    directory=Config.JOB_DIR,
+    workers=Config.JOB_WORKERS,
+)
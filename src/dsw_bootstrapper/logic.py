@@ -1,459 +1,524 @@
-import io
+import collections
+import concurrent.futures
+import contextlib
+import datetime
+import hashlib
 import json
+import mmap
+import multiprocessing
+import os
+import threading
+import time
 import uuid
 import zipfile
 
-import minio
-from sqlalchemy.orm import Session
+from typing import IO, Any, Callable, Iterable, Iterator
+
+from sqlalchemy import Row, inspect, select, tuple_
+from sqlalchemy import event as sa_event
+from sqlalchemy.orm import Session, undefer_group
 
 from . import models, schemas
+from .cache import ArtifactCache, artifact_cache
 from .config import Config
+from .db import Base
+from .metrics import metrics
+from .plan import PlanStep, RecipePlan, RecipePlanner
+from .sqlrender import insert_renderer, quote, render_entry
+from .storage import ObjectClient, S3Storage, S3Stream
+from .zipstream import CompressedEntry, stream_zip, write_compressed
 
 _TENANT_PLACEHOLDER = "<<|TENANT-ID|>>"
-
-
-def _package2insert(package: models.Package) -> str:
-    fields = {
-        'id': f"'{package.id}'",
-        'name': f"'{package.name}'",
-        'organization_id': f"'{package.organization_id}'",
-        'km_id': f"'{package.km_id}'",
-        'version': f"'{package.version}'",
-        'metamodel_version': f"{package.metamodel_version}",
-        'description': f"'{package.description}'",
-        'readme': f"'{package.readme}'",
-        'license': f"'{package.license}'",
-        'previous_package_id': f"'{package.previous_package_id}'" if package.previous_package_id else "NULL",
-        'fork_of_package_id': f"'{package.fork_of_package_id}'" if package.fork_of_package_id else "NULL",
-        'merge_checkpoint_package_id': f"'{package.merge_checkpoint_package_id}'" if package.merge_checkpoint_package_id else "NULL",
-        'events': f"'{package.events}'",
-        'created_at': f"'{package.created_at.isoformat()}'",
-        'tenant_uuid': _TENANT_PLACEHOLDER,
-        'phase': f"'{package.phase}'",
-        'non_editable': 'TRUE' if package.non_editable else 'FALSE',
-    }
-    fields_sql = ", ".join(fields.keys())
-    values_sql = ", ".join(fields.values())
-    sql_script = f"""INSERT INTO package ({fields_sql}) VALUES ({values_sql});\n"""
-    return sql_script
-
-
-def _dt2insert(document_template: models.DocumentTemplate) -> str:
-    fields = {
-        'id': f"'{document_template.id}'",
-        'name': f"'{document_template.name}'",
-        'organization_id': f"'{document_template.organization_id}'",
-        'template_id': f"'{document_template.template_id}'",
-        'version': f"'{document_template.version}'",
-        'metamodel_version': f"'{document_template.metamodel_version}'",
-        'description': f"'{document_template.description}'",
-        'readme': f"'{document_template.readme}'",
-        'license': f"'{document_template.license}'",
-        'allowed_packages': f"'{document_template.allowed_packages}'",
-        'created_at': f"'{document_template.created_at.isoformat()}'",
-        'tenant_uuid': _TENANT_PLACEHOLDER,
-        'updated_at': f"'{document_template.updated_at.isoformat()}'",
-        'phase': f"'{document_template.phase}'",
-        'non_editable': 'TRUE' if document_template.non_editable else 'FALSE',
-    }
-    fields_sql = ", ".join(fields.keys())
-    values_sql = ", ".join(fields.values())
-    sql_script = f"""INSERT INTO document_template ({fields_sql}) VALUES ({values_sql});\n"""
-    return sql_script
-
-
-def _dt_assets2insert(assets: list[models.DocumentTemplateAsset]) -> str:
-    sql_script = ""
-    for asset in assets:
-        fields = {
-            'document_template_id': f"'{asset.document_template_id}'",
-            'uuid': f"'{asset.uuid}'",
-            'file_name': f"'{asset.file_name}'",
-            'content_type': f"'{asset.content_type}'",
-            'tenant_uuid': _TENANT_PLACEHOLDER,
-            'file_size': f"{asset.file_size}",
-            'created_at': f"'{asset.created_at.isoformat()}'",
-            'updated_at': f"'{asset.updated_at.isoformat()}'",
-        }
-        fields_sql = ", ".join(fields.keys())
-        values_sql = ", ".join(fields.values())
-        sql_script += f"""INSERT INTO document_template_asset ({fields_sql}) VALUES ({values_sql});\n"""
-    return sql_script
-
-
-def _dt_files2insert(files: list[models.DocumentTemplateFile]) -> str:
-    sql_script = ""
-    for file in files:
-        # escape content as it may contain quotes
-        econtent = file.content.replace("'", "''")
-        fields = {
-            'document_template_id': f"'{file.document_template_id}'",
-            'uuid': f"'{file.uuid}'",
-            'file_name': f"'{file.file_name}'",
-            'content': f"'{econtent}'",
-            'tenant_uuid': _TENANT_PLACEHOLDER,
-            'created_at': f"'{file.created_at.isoformat()}'",
-            'updated_at': f"'{file.updated_at.isoformat()}'",
-        }
-        fields_sql = ", ".join(fields.keys())
-        values_sql = ", ".join(fields.values())
-        sql_script += f"""INSERT INTO document_template_file ({fields_sql}) VALUES ({values_sql});\n"""
-    return sql_script
-
-
-def _dt_formats2insert(formats: list[models.DocumentTemplateFormat]) -> str:
-    sql_script = ""
-    for fmt in formats:
-        fields = {
-            'document_template_id': f"'{fmt.document_template_id}'",
-            'uuid': f"'{fmt.uuid}'",
-            'name': f"'{fmt.name}'",
-            'icon': f"'{fmt.icon}'",
-            'tenant_uuid': _TENANT_PLACEHOLDER,
-            'created_at': f"'{fmt.created_at.isoformat()}'",
-            'updated_at': f"'{fmt.updated_at.isoformat()}'",
-        }
-        fields_sql = ", ".join(fields.keys())
-        values_sql = ", ".join(fields.values())
-        sql_script += f"""INSERT INTO document_template_format ({fields_sql}) VALUES ({values_sql});\n"""
-    return sql_script
-
-
-def _dt_steps2insert(steps: list[models.DocumentTemplateFormatStep]) -> str:
-    sql_script = ""
-    for step in steps:
-        # encode options from list of dicts to JSON string
-        eoptions = json.dumps(step.options).replace("'", "''")
-        fields = {
-            'document_template_id': f"'{step.document_template_id}'",
-            'format_uuid': f"'{step.format_uuid}'",
-            'position': f"{step.position}",
-            'name': f"'{step.name}'",
-            'options': f"'{eoptions}'",
-            'tenant_uuid': _TENANT_PLACEHOLDER,
-            'created_at': f"'{step.created_at.isoformat()}'",
-            'updated_at': f"'{step.updated_at.isoformat()}'",
-        }
-        fields_sql = ", ".join(fields.keys())
-        values_sql = ", ".join(fields.values())
-        sql_script += f"""INSERT INTO document_template_format_step ({fields_sql}) VALUES ({values_sql});\n"""
-    return sql_script
-
-
-def _questionnaire2insert(questionnaire_uuid: str, questionnaire: models.Questionnaire) -> str:
-    fields = {
-        'uuid': f"'{questionnaire_uuid}'",
-        'name': f"'{questionnaire.name}'",
-        'visibility': f"'{questionnaire.visibility}'",
-        'sharing': f"'{questionnaire.sharing}'",
-        'package_id': f"'{questionnaire.package_id}'",
-        'selected_question_tag_uuids': f"ARRAY{questionnaire.selected_question_tag_uuids}" if questionnaire.selected_question_tag_uuids else "NULL",
-        'document_template_id': f"'{questionnaire.document_template_id}'" if questionnaire.document_template_id else "NULL",
-        'format_uuid': f"'{questionnaire.format_uuid}'" if questionnaire.format_uuid else "NULL",
-        'created_by': "NULL",
-        'created_at': f"'{questionnaire.created_at.isoformat()}'",
-        'updated_at': f"'{questionnaire.updated_at.isoformat()}'",
-        'description': f"'{questionnaire.description}'",
-        'is_template': 'TRUE' if questionnaire.is_template else 'FALSE',
-        'squashed': 'TRUE' if questionnaire.squashed else 'FALSE',
-        'tenant_uuid': _TENANT_PLACEHOLDER,
-        'project_tags': f"ARRAY{questionnaire.project_tags}" if questionnaire.project_tags else "NULL",
-    }
-    fields_sql = ", ".join(fields.keys())
-    values_sql = ", ".join(fields.values())
-    sql_script = f"""INSERT INTO questionnaire ({fields_sql}) VALUES ({values_sql});\n"""
-    return sql_script
-
-
-def _questionnaire_events2insert(questionnaire_uuid: str, events: list[models.QuestionnaireEvent]) -> str:
-    sql_script = ""
-    for event in events:
-        fields = {
-            'uuid': f"'{event.uuid}'",
-            'event_type': f"'{event.event_type}'",
-            'path': f"'{event.path}'" if event.path else "NULL",
-            'created_at': f"'{event.created_at.isoformat()}'",
-            'created_by': "NULL",
-            'questionnaire_uuid': f"'{questionnaire_uuid}'",
-            'tenant_uuid': _TENANT_PLACEHOLDER,
-            'value_Type': f"'{event.value_type}'" if event.value_type else "NULL",
-            'value': f"'{event.value}'" if event.value else "NULL",
-            'value_id': f"'{event.value_id}'" if event.value_id else "NULL",
-            'value_raw': f"'{json.dumps(event.value_raw).replace("'", "''")}'" if event.value_raw else "NULL",
-        }
-        fields_sql = ", ".join(fields.keys())
-        values_sql = ", ".join(fields.values())
-        sql_script += f"""INSERT INTO questionnaire_event ({fields_sql}) VALUES ({values_sql});\n"""
-    return sql_script
-
-
-def _questionnaire_files2insert(questionnaire_uuid: str, files: list[models.QuestionnaireFile]) -> str:
-    sql_script = ""
-    for file in files:
-        fields = {
-            'uuid': f"'{file.uuid}'",
-            'file_name': f"'{file.file_name}'",
-            'content_type': f"'{file.content_type}'",
-            'file_size': f"{file.file_size}",
-            'questionnaire_uuid': f"'{questionnaire_uuid}'",
-            'created_by': "NULL",
-            'tenant_uuid': _TENANT_PLACEHOLDER,
-            'created_at': f"'{file.created_at.isoformat()}'",
-        }
-        fields_sql = ", ".join(fields.keys())
-        values_sql = ", ".join(fields.values())
-        sql_script += f"""INSERT INTO questionnaire_file ({fields_sql}) VALUES ({values_sql});\n"""
-    return sql_script
-
-
-def _questionnaire_versions2insert(questionnaire_uuid: str, versions: list[models.QuestionnaireVersion]) -> str:
-    sql_script = ""
-    for version in versions:
-        fields = {
-            'uuid': f"'{version.uuid}'",
-            'name': f"'{version.name}'",
-            'description': f"'{version.description}'",
-            'event_uuid': f"'{version.event_uuid}'",
-            'questionnaire_uuid': f"'{questionnaire_uuid}'",
-            'tenant_uuid': _TENANT_PLACEHOLDER,
-            'created_by': "NULL",
-            'created_at': f"'{version.created_at.isoformat()}'",
-            'updated_at': f"'{version.updated_at.isoformat()}'",
-        }
-        fields_sql = ", ".join(fields.keys())
-        values_sql = ", ".join(fields.values())
-        sql_script += f"""INSERT INTO questionnaire_version ({fields_sql}) VALUES ({values_sql});\n"""
-    return sql_script
-
-
-def _document2insert(document_uuid: str, questionnaire_uuid: str, document: models.Document) -> str:
-    fields = {
-        'uuid': f"'{document_uuid}'",
-        'name': f"'{document.name}'",
-        'state': f"'{document.state}'",
-        'durability': f"'{document.durability}'",
-        'questionnaire_uuid': f"'{questionnaire_uuid}'",
-        'questionnaire_event_uuid': f"'{document.questionnaire_event_uuid}'",
-        'questionnaire_replies_hash': f"{document.questionnaire_replies_hash}",
-        'document_template_id': f"'{document.document_template_id}'",
-        'format_uuid': f"'{document.format_uuid}'",
-        'created_by': "NULL",
-        'retrieved_at': f"'{document.created_at.isoformat()}'" if document.retrieved_at else "NULL",
-        'finished_at': f"'{document.finished_at.isoformat()}'" if document.finished_at else "NULL",
-        'created_at': f"'{document.created_at.isoformat()}'",
-        'file_name': f"'{document.file_name}'" if document.file_name else "NULL",
-        'content_type': f"'{document.content_type}'" if document.content_type else "NULL",
-        'worker_log': f"'{document.worker_log}'" if document.worker_log else "NULL",
-        'tenant_uuid': _TENANT_PLACEHOLDER,
-        'file_size': f"{document.file_size}" if document.file_size else "NULL",
-    }
-    fields_sql = ", ".join(fields.keys())
-    values_sql = ", ".join(fields.values())
-    sql_script = f"""INSERT INTO document ({fields_sql}) VALUES ({values_sql});\n"""
-    return sql_script
-
-
-class S3Storage:
-
-    @staticmethod
-    def _get_endpoint(url: str):
-        parts = url.split('://', maxsplit=1)
-        return parts[0] if len(parts) == 1 else parts[1]
-
-    def __init__(self, tenant_uuid: str):
-        self.client = minio.Minio(
-            endpoint=self._get_endpoint(Config.S3_URL),
-            access_key=Config.S3_ACCESS_KEY,
-            secret_key=Config.S3_SECRET_KEY,
-            secure=Config.S3_URL.startswith('https://'),
-            region=Config.S3_REGION,
-        )
-        self.tenant_uuid = tenant_uuid
-        self.bucket = Config.S3_BUCKET
-
-    def _path(self, path: str) -> str:
-        if self.tenant_uuid == "00000000-0000-0000-0000-000000000000":
-            return path
-        return f"{self.tenant_uuid}/{path}"
-
-    def download_object(self, path: str) -> bytes:
-        response = self.client.get_object(
-            bucket_name=self.bucket,
-            object_name=self._path(path),
-        )
-        data = response.read()
-        response.close()
-        response.release_conn()
-        return data
+# columns rendered the same for all rows, users are not seeded with the recipe
+_OVERRIDES = {
+    "tenant_uuid": _TENANT_PLACEHOLDER,
+    "created_by": "NULL",
+}
+_INSERT_BATCH_SIZE = 1000
+_EVENTS_YIELD_PER = 1000
+_SCRIPT_CHUNK_SIZE = 64 * 1024
+# bump whenever rendering changes so cached artifacts are not reused
+_CACHE_VERSION = 4
+
+_ZIP_COMPRESSION = {
+    "store": zipfile.ZIP_STORED,
+    "deflate": zipfile.ZIP_DEFLATED,
+    "bzip2": zipfile.ZIP_BZIP2,
+    "lzma": zipfile.ZIP_LZMA,
+}
+# content types of files that are compressed already (images, PDF, office
+# documents, archives), deflating them again only burns CPU
+_COMPRESSED_CONTENT_TYPES = (
+    "image/",
+    "audio/",
+    "video/",
+    "font/woff",
+    "application/pdf",
+    "application/zip",
+    "application/gzip",
+    "application/x-7z-compressed",
+    "application/x-bzip2",
+    "application/x-xz",
+    "application/epub+zip",
+    "application/vnd.openxmlformats-officedocument.",
+    "application/vnd.oasis.opendocument.",
+)
+_UNCOMPRESSED_CONTENT_TYPES = ("image/svg+xml", "image/bmp", "image/x-ms-bmp", "image/tiff")
+
+
+def _is_compressed(content_type: str | None) -> bool:
+    if not content_type:
+        return False
+    content_type = content_type.split(";")[0].strip().lower()
+    if content_type in _UNCOMPRESSED_CONTENT_TYPES:
+        return False
+    return content_type.startswith(_COMPRESSED_CONTENT_TYPES)
+
+
+def _load_payloads(db: Session, model: type[Base], entities: list):
+    """Load the deferred "payload" columns of already loaded `entities` in one query."""
+    if not entities:
+        return
+    db.execute(
+        select(model).where(
+            tuple_(*inspect(model).primary_key).in_([inspect(entity).identity for entity in entities]),
+        ).options(undefer_group("payload"))
+    ).all()
+
+
+class BuildProgress:
+    """Live counters and phase timings of a recipe build, safe to read from other threads.
+
+    Everything is also added to the process-wide `metrics`. Phases overlap:
+    the time of a step (e.g. `questionnaire`) includes the `db`, `render`,
+    `compress`, `s3` and `zip` time spent on it, and `s3` downloads run
+    concurrently so their time may exceed the wall time of the build.
+    """
+
+    def __init__(self):
+        self.phase = "queued"
+        self.queries = 0
+        self.rows = 0
+        self.s3_bytes = 0
+        self.entries = 0
+        self.timings = collections.defaultdict(float)  # type: collections.defaultdict[str, float]
+        self._lock = threading.Lock()
+
+    def add(self, counter: str, value: int = 1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + value)
+        metrics.inc(f"recipe_{counter}_total", value)
+
+    def record(self, phase: str, seconds: float):
+        with self._lock:
+            self.timings[phase] += seconds
+        metrics.observe("recipe_phase_seconds", seconds, phase=phase)
+
+    @contextlib.contextmanager
+    def span(self, phase: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - start)
+
+    def server_timing(self) -> str:
+        """Timings so far as a `Server-Timing` header value (durations in ms)."""
+        with self._lock:
+            timings = list(self.timings.items())
+        return ", ".join(f"{phase};dur={seconds * 1000:.1f}" for phase, seconds in timings)
+
+    @contextlib.contextmanager
+    def track_queries(self, db: Session):
+        # cursor events of the session connection time every statement and
+        # count rows of buffered results, streamed rows are counted by callers
+        connection = db.connection()
+        starts = []  # type: list[float]
+
+        def on_execute(_):
+            self.add("queries")
+
+        def before_cursor_execute(*_):
+            starts.append(time.perf_counter())
+
+        def after_cursor_execute(_conn, cursor, *_):
+            self.record("db", time.perf_counter() - starts.pop())
+            if cursor.description is not None and cursor.rowcount > 0:
+                self.add("rows", cursor.rowcount)
+
+        sa_event.listen(db, "do_orm_execute", on_execute)
+        sa_event.listen(connection, "before_cursor_execute", before_cursor_execute)
+        sa_event.listen(connection, "after_cursor_execute", after_cursor_execute)
+        try:
+            yield
+        finally:
+            sa_event.remove(db, "do_orm_execute", on_execute)
+            sa_event.remove(connection, "before_cursor_execute", before_cursor_execute)
+            sa_event.remove(connection, "after_cursor_execute", after_cursor_execute)
+
+    @contextlib.contextmanager
+    def track_build(self):
+        status = "failed"
+        try:
+            with self.span("build"):
+                yield
+            status = "done"
+        finally:
+            metrics.inc("recipe_builds_total", status=status)
+
+
+# spawned (not forked) workers as the app runs DB, S3 and ZIP stream threads;
+# they run `sqlrender.render_entry`, importing only what rendering needs
+_RENDER_POOL = concurrent.futures.ProcessPoolExecutor(
+    max_workers=Config.RENDER_WORKERS,
+    mp_context=multiprocessing.get_context("spawn"),
+) if Config.RENDER_WORKERS > 0 else None
+
+
+def _load_deferred(rows: list):
+    # entities are pickled to render workers where deferred columns cannot be
+    # lazy loaded (e.g. script evicted from the cache after _load_payloads)
+    for entity in rows:
+        for name in inspect(entity).unloaded:
+            getattr(entity, name)
+
+
+def _completed(result: Any) -> concurrent.futures.Future:
+    future = concurrent.futures.Future()  # type: concurrent.futures.Future
+    future.set_result(result)
+    return future
 
 
 class RecipeBuilder:
 
-    def __init__(self, tenant_uuid: uuid.UUID, zip_file: zipfile.ZipFile, db: Session):
+    def __init__(self, tenant_uuid: uuid.UUID, zip_file: zipfile.ZipFile, db: Session,
+                 progress: BuildProgress | None = None, *, s3_client: ObjectClient | None = None):
         self.tenant_uuid = tenant_uuid
         self.zip_file = zip_file
         self.db = db
-        self.s3 = S3Storage(str(tenant_uuid))
+        self.progress = progress or BuildProgress()
+        self.s3 = S3Storage(str(tenant_uuid), progress=self.progress, client=s3_client)
         self._next_package_n = 1
         self._next_gen_uuid = 0
         self._questionnaire_uuids = {}  # type: dict[uuid.UUID, str]
         self._document_uuids = {}  # type: dict[uuid.UUID, str]
-        self._added_package_ids = set()  # type: set[str]
-        self._added_document_template_ids = set()  # type: set[str]
-        self._added_questionnaire_uuids = set()  # type: set[uuid.UUID]
-        self._added_document_uuids = set()  # type: set[uuid.UUID]
         self.db_scripts = []  # type: list[str]
+        self.insert_batch_size = 1
+        self.sql_compression = (zipfile.ZIP_DEFLATED, None)  # type: tuple[int, int | None]
+        self.files_compression = "auto"
+        self.manifest_entities = []  # type: list[schemas.ManifestEntity]
+        self.manifest_entries = []  # type: list[schemas.ManifestEntry]
+        self._step = None  # type: PlanStep | None
+        self._base_id = None  # type: uuid.UUID | None
+        self._pending = collections.deque()  # type: collections.deque[tuple[concurrent.futures.Future, Callable]]
+        self._window = 2 * Config.RENDER_WORKERS
 
     def _next_uuid_placeholder(self) -> str:
         placeholder = "{{-UUID[" + str(self._next_gen_uuid) + "]-}}"
         self._next_gen_uuid += 1
         return placeholder
 
-    def run(self, instruction: schemas.RecipeInstruction):
-        for package in instruction.packages:
-            self._add_package(package)
-        for document_template in instruction.document_templates:
-            self._add_document_template(document_template)
-        for questionnaire in instruction.questionnaires:
-            self._add_questionnaire(questionnaire)
-        for document in instruction.documents:
-            self._add_document(document)
-        self._add_json_descriptor(instruction)
-
-    def _add_db_script(self, path: str, data: str):
-        self.db_scripts.append(path)
-        self.zip_file.writestr(
-            zinfo_or_arcname=path,
-            data=data,
+    def run(self, instruction: schemas.RecipeInstruction, plan: RecipePlan):
+        if instruction.sql_format == "batch":
+            self.insert_batch_size = _INSERT_BATCH_SIZE
+        self.sql_compression = (
+            _ZIP_COMPRESSION[instruction.compression.sql],
+            instruction.compression.sql_level,
         )
-
-    def _add_s3_object(self, path: str, data: bytes | str):
-        self.zip_file.writestr(
-            zinfo_or_arcname=f"files/{path}",
-            data=data,
+        self.files_compression = instruction.compression.files
+        steps = self._select_steps(instruction, plan)
+        self._load_payloads(plan, steps)
+        # documents are downloaded ahead (one window over all of them) while
+        # the preceding entities are written, not a round trip per document
+        documents = [step.entity for step in steps if step.kind == "document"]
+        document_data = self.s3.download_objects(
+            paths=[f"documents/{str(document.uuid)}" for document in documents],
+            versions=[document.created_at.isoformat() for document in documents],
+            sizes=[document.file_size for document in documents],
         )
-
-    def _add_package(self, package: schemas.PackageIn):
-        if package.id in self._added_package_ids:
+        try:
+            for step in steps:
+                self._step = step
+                with self.progress.span(step.kind):
+                    if step.kind == "package":
+                        self._add_package(step.entity)
+                    elif step.kind == "document_template":
+                        self._add_document_template(step.entity, plan)
+                    elif step.kind == "questionnaire":
+                        self._add_questionnaire(step.entity, step.spec, plan)
+                    elif step.kind == "document":
+                        self._add_document(step.entity, step.spec, next(document_data))
+            self._add_json_descriptor(instruction)
+            self._add_manifest(instruction)
+        finally:
+            document_data.close()
+            for future, _ in self._pending:
+                future.cancel()
+
+    def _enqueue(self, future: concurrent.futures.Future, write: Callable[[Any], None]):
+        # entries are written in order as soon as they are ready, at most
+        # `_window` of them are rendered (or downloaded) ahead of the writer
+        self._pending.append((future, write))
+        while self._pending and (len(self._pending) > self._window or self._pending[0][0].done()):
+            future, write = self._pending.popleft()
+            write(future.result())
+
+    def _flush(self):
+        while self._pending:
+            future, write = self._pending.popleft()
+            write(future.result())
+
+    def _add_manifest_entry(self, step: PlanStep | None, path: str, sha256: str, size: int):
+        if step is None:
             return
-        self._added_package_ids.add(package.id)
-        result = self.db.query(models.Package).filter(
-            models.Package.id == package.id,
-            models.Package.tenant_uuid == self.tenant_uuid
-        ).first()  # type: models.Package | None
-        if result is None:
-            raise ValueError("Package not found")
-        if result.previous_package_id and package.include_dependencies:
-            self._add_package(schemas.PackageIn(
-                id=result.previous_package_id,
-                includeDependencies=package.include_dependencies,
-            ))
-        if result.fork_of_package_id and package.include_dependencies:
-            self._add_package(schemas.PackageIn(
-                id=result.fork_of_package_id,
-                includeDependencies=package.include_dependencies,
-            ))
-        if result.merge_checkpoint_package_id and package.include_dependencies:
-            self._add_package(schemas.PackageIn(
-                id=result.merge_checkpoint_package_id,
-                includeDependencies=package.include_dependencies,
-            ))
+        self.manifest_entries.append(schemas.ManifestEntry(
+            path=path,
+            sha256=sha256,
+            size=size,
+            kind=step.kind,
+            entityId=step.entity_id,
+            updatedAt=step.updated_at,
+        ))
+
+    def _add_script(self, path: str, model: type[Base], rows: list, *, overrides: dict[str, str] | None = None,
+                    cache_key: tuple | None = None):
+        """Render inserts of `rows` and compress them, in the render pool if enabled."""
+        self.db_scripts.append(path)
+        step = self._step
+        args = (model, rows, self.insert_batch_size, {**_OVERRIDES, **(overrides or {})}, self.sql_compression)
+        cached = self._cached_entry(cache_key) if cache_key is not None else None
+        if cached is not None:
+            future = _completed((cached, None, None))
+        elif _RENDER_POOL is not None:
+            _load_deferred(rows)
+            future = _RENDER_POOL.submit(render_entry, *args)
+        else:
+            future = _completed(render_entry(*args))
+
+        def write(result: tuple[CompressedEntry, float | None, float | None]):
+            entry, render_seconds, compress_seconds = result
+            if render_seconds is not None and compress_seconds is not None:
+                self.progress.record("render", render_seconds)
+                self.progress.record("compress", compress_seconds)
+                metrics.observe("recipe_render_seconds", render_seconds, table=model.__tablename__)
+            if cached is None and cache_key is not None and artifact_cache is not None:
+                artifact_cache.put(self._cache_key(cache_key), entry.to_bytes())
+            self.progress.add("entries")
+            with self.progress.span("zip"):
+                write_compressed(self.zip_file, path, entry)
+            self._add_manifest_entry(step, path, entry.sha256.hex(), entry.file_size)
+
+        self._enqueue(future, write)
+
+    def _add_db_script(self, path: str, data: Iterable[str]):
+        # large scripts are rendered lazily and written in chunks
+        self._flush()
+        self.db_scripts.append(path)
+        self.progress.add("entries")
+        digest = hashlib.sha256()
+        size = 0
+        zinfo = zipfile.ZipInfo(filename=path, date_time=time.localtime(time.time())[:6])
+        zinfo.compress_type = self.sql_compression[0]
+        zinfo._compresslevel = self.sql_compression[1]  # type: ignore[attr-defined]  # pylint: disable=protected-access
+        # rows are fetched and rendered lazily, all of it is counted as zip time
+        with self.progress.span("zip"), self.zip_file.open(zinfo, mode="w", force_zip64=True) as entry:
+            chunk = []  # type: list[str]
+            chunk_size = 0
+            for part in data:
+                chunk.append(part)
+                chunk_size += len(part)
+                if chunk_size >= _SCRIPT_CHUNK_SIZE:
+                    size += self._write_chunk(entry, chunk, digest)
+                    chunk_size = 0
+            if chunk:
+                size += self._write_chunk(entry, chunk, digest)
+        self._add_manifest_entry(self._step, path, digest.hexdigest(), size)
 
-        sql_script = _package2insert(result)
+    @staticmethod
+    def _write_chunk(entry: IO[bytes], chunk: list[str], digest) -> int:
+        data = "".join(chunk).encode("utf-8")
+        chunk.clear()
+        digest.update(data)
+        entry.write(data)
+        return len(data)
+
+    def _add_s3_object(self, path: str, data: bytes | mmap.mmap | S3Stream, content_type: str | None = None):
+        step = self._step
+        compress_type = zipfile.ZIP_DEFLATED
+        if self.files_compression == "store" or (self.files_compression == "auto" and _is_compressed(content_type)):
+            compress_type = zipfile.ZIP_STORED
+
+        def write(data: bytes | mmap.mmap | S3Stream):
+            self.progress.add("entries")
+            if isinstance(data, S3Stream):
+                self._write_s3_stream(step, f"files/{path}", data, compress_type)
+                return
+            with self.progress.span("zip"):
+                self.zip_file.writestr(
+                    zinfo_or_arcname=f"files/{path}",
+                    data=data,  # type: ignore[arg-type]
+                    compress_type=compress_type,
+                )
+            self._add_manifest_entry(step, f"files/{path}", hashlib.sha256(data).hexdigest(), len(data))
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+        self._enqueue(_completed(data), write)
+
+    def _write_s3_stream(self, step: PlanStep | None, path: str, data: S3Stream, compress_type: int):
+        # constant memory regardless of the object size, the download happens
+        # only now as the entry is written (in order, after preceding entries)
+        digest = hashlib.sha256()
+        size = 0
+        zinfo = zipfile.ZipInfo(filename=path, date_time=time.localtime(time.time())[:6])
+        zinfo.compress_type = compress_type
+        with self.progress.span("zip"), self.zip_file.open(zinfo, mode="w", force_zip64=True) as entry:
+            for chunk in data.chunks():
+                digest.update(chunk)
+                entry.write(chunk)
+                size += len(chunk)
+        self._add_manifest_entry(step, path, digest.hexdigest(), size)
+
+    def _fingerprint(self, step: PlanStep) -> str:
+        # everything the rendered entity depends on besides its own contents
+        data = json.dumps([
+            _CACHE_VERSION,
+            step.kind,
+            step.entity_id,
+            step.updated_at.isoformat(),
+            step.spec.model_dump(mode="json"),
+            self.insert_batch_size,
+        ])
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def _select_steps(self, instruction: schemas.RecipeInstruction, plan: RecipePlan) -> list[PlanStep]:
+        """Record planned entities in the manifest and return those to be built.
+
+        For delta recipes, entities unchanged since the base manifest are left
+        out unless they get new UUIDs (those are seeded as new copies anyway).
+        """
+        base_fingerprints = {}  # type: dict[tuple[str, str], str]
+        base = instruction.base_manifest
+        if base is not None and base.tenant_uuid == self.tenant_uuid:
+            self._base_id = base.id
+            base_fingerprints = {(entity.kind, entity.id): entity.fingerprint for entity in base.entities}
+        steps = []
+        for step in plan.steps:
+            fingerprint = self._fingerprint(step)
+            included = (getattr(step.spec, "new_uuid", False)
+                        or base_fingerprints.get((step.kind, step.entity_id)) != fingerprint)
+            self.manifest_entities.append(schemas.ManifestEntity(
+                kind=step.kind,
+                id=step.entity_id,
+                updatedAt=step.updated_at,
+                fingerprint=fingerprint,
+                included=included,
+            ))
+            if included:
+                steps.append(step)
+        return steps
+
+    def _load_payloads(self, plan: RecipePlan, steps: list[PlanStep]):
+        # heavy columns are deferred on the models, undefer them (one query
+        # per model) only for entities whose scripts are actually rendered
+        packages = [
+            step.entity for step in steps
+            if step.kind == "package" and not self._is_cached(self._package_key(step.entity))
+        ]
+        document_templates = [
+            step.entity for step in steps
+            if step.kind == "document_template" and not self._is_cached(self._dt_key(step.entity) + ("01",))
+        ]
+        dt_files = [
+            file for step in steps
+            if step.kind == "document_template" and not self._is_cached(self._dt_key(step.entity) + ("03",))
+            for file in plan.dt_files.get(step.entity.id, [])
+        ]
+        documents = [step.entity for step in steps if step.kind == "document"]
+        _load_payloads(self.db, models.Package, packages)
+        _load_payloads(self.db, models.DocumentTemplate, document_templates)
+        _load_payloads(self.db, models.DocumentTemplateFile, dt_files)
+        _load_payloads(self.db, models.Document, documents)
+
+    def _package_key(self, package: models.Package) -> tuple:
+        return ("package", package.id, package.created_at.isoformat())
+
+    def _dt_key(self, document_template: models.DocumentTemplate) -> tuple:
+        return ("document-template", document_template.id, document_template.updated_at.isoformat(),
+                self.insert_batch_size)
+
+    def _cache_key(self, key: tuple) -> str:
+        # entries are cached compressed, so the compression is part of the key
+        return ArtifactCache.key(_CACHE_VERSION, self.tenant_uuid, *self.sql_compression, *key)
+
+    def _is_cached(self, key: tuple) -> bool:
+        return artifact_cache is not None and self._cache_key(key) in artifact_cache
+
+    def _cached_entry(self, key: tuple) -> CompressedEntry | None:
+        if artifact_cache is None:
+            return None
+        data = artifact_cache.get(self._cache_key(key))
+        return CompressedEntry.from_bytes(data) if data is not None else None
+
+    def _add_package(self, package: models.Package):
         name = package.id.replace(":", "_")
-        self._add_db_script(
-            path=f"packages/{self._next_package_n}__{name}.sql",
-            data=sql_script,
+        self._add_script(
+            f"packages/{self._next_package_n}__{name}.sql",
+            models.Package, [package],
+            cache_key=self._package_key(package),
         )
         self._next_package_n += 1
 
-    def _add_document_template(self, document_template: schemas.DocumentTemplateIn):
-        if document_template.id in self._added_document_template_ids:
-            return
-        self._added_document_template_ids.add(document_template.id)
-        result = self.db.query(models.DocumentTemplate).filter(
-            models.DocumentTemplate.id == document_template.id,
-            models.DocumentTemplate.tenant_uuid == self.tenant_uuid
-        ).first()  # type: models.DocumentTemplate | None
-        if result is None:
-            raise ValueError("Document Template not found")
-
-        assets = self.db.query(models.DocumentTemplateAsset).filter(
-            models.DocumentTemplateAsset.document_template_id == document_template.id,
-            models.DocumentTemplateAsset.tenant_uuid == self.tenant_uuid
-        ).all()
-        files = self.db.query(models.DocumentTemplateFile).filter(
-            models.DocumentTemplateFile.document_template_id == document_template.id,
-            models.DocumentTemplateFile.tenant_uuid == self.tenant_uuid
-        ).all()
-        formats = self.db.query(models.DocumentTemplateFormat).filter(
-            models.DocumentTemplateFormat.document_template_id == document_template.id,
-            models.DocumentTemplateFormat.tenant_uuid == self.tenant_uuid
-        ).all()
-        steps = self.db.query(models.DocumentTemplateFormatStep).filter(
-            models.DocumentTemplateFormatStep.document_template_id == document_template.id,
-            models.DocumentTemplateFormatStep.tenant_uuid == self.tenant_uuid
-        ).all()
+    def _add_document_template(self, document_template: models.DocumentTemplate, plan: RecipePlan):
+        assets = plan.dt_assets.get(document_template.id, [])
+        files = plan.dt_files.get(document_template.id, [])
+        formats = plan.dt_formats.get(document_template.id, [])
+        steps = plan.dt_steps.get(document_template.id, [])
 
         name = document_template.id.replace(":", "_")
-        self._add_db_script(
-            path=f"document-template/{name}/01__document-template.sql",
-            data=_dt2insert(result),
+        key = self._dt_key(document_template)
+        self._add_script(
+            f"document-template/{name}/01__document-template.sql",
+            models.DocumentTemplate, [document_template],
+            cache_key=key + ("01",),
+        )
+        # assets are immutable per uuid and updated_at
+        asset_data = self.s3.download_objects(
+            paths=[f"templates/{document_template.id}/{str(asset.uuid)}" for asset in assets],
+            versions=[asset.updated_at.isoformat() for asset in assets],
+            sizes=[asset.file_size for asset in assets],
         )
-        for asset in assets:
-            data = self.s3.download_object(f"templates/{document_template.id}/{str(asset.uuid)}")
+        for asset, data in zip(assets, asset_data):
             self._add_s3_object(
                 path=f"templates/{name}/{str(asset.uuid)}",
                 data=data,
+                content_type=asset.content_type,
             )
-        self._add_db_script(
-            path=f"document-template/{name}/02__assets.sql",
-            data=_dt_assets2insert(assets),
+        self._add_script(
+            f"document-template/{name}/02__assets.sql",
+            models.DocumentTemplateAsset, assets,
+            cache_key=key + ("02",),
         )
-        self._add_db_script(
-            path=f"document-template/{name}/03__files.sql",
-            data=_dt_files2insert(files),
+        self._add_script(
+            f"document-template/{name}/03__files.sql",
+            models.DocumentTemplateFile, files,
+            cache_key=key + ("03",),
         )
-        self._add_db_script(
-            path=f"document-template/{name}/04__formats.sql",
-            data=_dt_formats2insert(formats),
+        self._add_script(
+            f"document-template/{name}/04__formats.sql",
+            models.DocumentTemplateFormat, formats,
+            cache_key=key + ("04",),
         )
-        self._add_db_script(
-            path=f"document-template/{name}/05__steps.sql",
-            data=_dt_steps2insert(steps),
+        self._add_script(
+            f"document-template/{name}/05__steps.sql",
+            models.DocumentTemplateFormatStep, steps,
+            cache_key=key + ("05",),
         )
 
-    def _add_questionnaire(self, questionnaire: schemas.QuestionnaireIn):
-        if questionnaire.uuid in self._added_questionnaire_uuids:
-            return
-        self._added_questionnaire_uuids.add(questionnaire.uuid)
-        result = self.db.query(models.Questionnaire).filter(
-            models.Questionnaire.uuid == questionnaire.uuid,
-            models.Questionnaire.tenant_uuid == self.tenant_uuid
-        ).first()  # type: models.Questionnaire | None
-        if result is None:
-            raise ValueError("Questionnaire not found")
-        if result.package_id and questionnaire.include_dependencies:
-            self._add_package(schemas.PackageIn(
-                id=result.package_id,
-                includeDependencies=True,
-            ))
-        if result.document_template_id and questionnaire.include_dependencies:
-            self._add_document_template(schemas.DocumentTemplateIn(
-                id=result.document_template_id,
-            ))
-        events = self.db.query(models.QuestionnaireEvent).filter(
-            models.QuestionnaireEvent.questionnaire_uuid == questionnaire.uuid,
-            models.QuestionnaireEvent.tenant_uuid == self.tenant_uuid
-        ).all()
-        files = self.db.query(models.QuestionnaireFile).filter(
-            models.QuestionnaireFile.questionnaire_uuid == questionnaire.uuid,
-            models.QuestionnaireFile.tenant_uuid == self.tenant_uuid
-        ).all()
-        versions = self.db.query(models.QuestionnaireVersion).filter(
-            models.QuestionnaireVersion.questionnaire_uuid == questionnaire.uuid,
-            models.QuestionnaireVersion.tenant_uuid == self.tenant_uuid
-        ).all()
+    def _add_questionnaire(self, result: models.Questionnaire, questionnaire: schemas.QuestionnaireIn,
+                           plan: RecipePlan):
+        files = plan.questionnaire_files.get(questionnaire.uuid, [])
+        versions = plan.questionnaire_versions.get(questionnaire.uuid, [])
 
         questionnaire_uuid = str(questionnaire.uuid)
         if questionnaire.new_uuid:
@@ -461,54 +526,67 @@ class RecipeBuilder:
             self._questionnaire_uuids[questionnaire.uuid] = str(questionnaire_uuid)
 
         name = result.name.replace(" ", "_").lower()
-        self._add_db_script(
-            path=f"questionnaires/{name}/01__questionnaire.sql",
-            data=_questionnaire2insert(questionnaire_uuid, result),
+        self._add_script(
+            f"questionnaires/{name}/01__questionnaire.sql",
+            models.Questionnaire, [result],
+            overrides={"uuid": quote(questionnaire_uuid)},
         )
+        overrides = {**_OVERRIDES, "questionnaire_uuid": quote(questionnaire_uuid)}
         self._add_db_script(
             path=f"questionnaires/{name}/02__events.sql",
-            data=_questionnaire_events2insert(questionnaire_uuid, events),
+            data=insert_renderer(models.QuestionnaireEvent).iter_inserts(
+                self._iter_events(questionnaire.uuid), self.insert_batch_size, overrides,
+            ),
         )
-        self._add_db_script(
-            path=f"questionnaires/{name}/03__files.sql",
-            data=_questionnaire_files2insert(questionnaire_uuid, files),
+        self._add_script(
+            f"questionnaires/{name}/03__files.sql",
+            models.QuestionnaireFile, files,
+            overrides=overrides,
         )
-        for file in files:
-            data = self.s3.download_object(
-                path=f"questionnaire-files/{str(questionnaire.uuid)}/{str(file.uuid)}"
-            )
+        file_data = self.s3.download_objects(
+            paths=[f"questionnaire-files/{str(questionnaire.uuid)}/{str(file.uuid)}" for file in files],
+            versions=[file.created_at.isoformat() for file in files],
+            sizes=[file.file_size for file in files],
+        )
+        for file, data in zip(files, file_data):
             self._add_s3_object(
                 path=f"questionnaires-files/{questionnaire_uuid}/{file.uuid}",
                 data=data,
+                content_type=file.content_type,
             )
         if questionnaire.include_versions:
-            self._add_db_script(
-                path=f"questionnaires/{name}/04__versions.sql",
-                data=_questionnaire_versions2insert(questionnaire_uuid, versions),
+            self._add_script(
+                f"questionnaires/{name}/04__versions.sql",
+                models.QuestionnaireVersion, versions,
+                overrides=overrides,
             )
 
-    def _add_document(self, document: schemas.DocumentIn):
-        if document.uuid in self._added_document_uuids:
-            return
-        self._added_document_uuids.add(document.uuid)
-        result = self.db.query(models.Document).filter(
-            models.Document.uuid == document.uuid,
-            models.Document.tenant_uuid == self.tenant_uuid
-        ).first()  # type: models.Document | None
-        if result is None:
-            raise ValueError("Document not found")
-        if result.document_template_id and document.include_dependencies:
-            self._add_document_template(schemas.DocumentTemplateIn(
-                id=result.document_template_id,
-            ))
-        if result.questionnaire_uuid and document.include_dependencies:
-            self._add_questionnaire(schemas.QuestionnaireIn(
-                uuid=result.questionnaire_uuid,
-                newUuid=document.new_uuid,
-                anonymize=document.anonymize,
-                includeDependencies=document.include_dependencies,
-                includeVersions=document.include_dependencies,
-            ))
+    def _iter_events(self, questionnaire_uuid: uuid.UUID) -> Iterator[Row]:
+        # server-side cursor over plain columns, no ORM objects kept around
+        event = models.QuestionnaireEvent
+        query = select(
+            event.uuid,
+            event.event_type,
+            event.path,
+            event.created_at,
+            event.value_type,
+            event.value,
+            event.value_id,
+            event.value_raw,
+        ).where(
+            event.questionnaire_uuid == questionnaire_uuid,
+            event.tenant_uuid == self.tenant_uuid,
+        ).execution_options(yield_per=_EVENTS_YIELD_PER)
+        rows = 0
+        try:
+            for row in self.db.execute(query):
+                rows += 1
+                yield row
+        finally:
+            self.progress.add("rows", rows)
+
+    def _add_document(self, result: models.Document, document: schemas.DocumentIn,
+                      data: bytes | mmap.mmap | S3Stream):
         questionnaire_uuid = str(result.questionnaire_uuid)
         if result.questionnaire_uuid in self._questionnaire_uuids:
             questionnaire_uuid = self._questionnaire_uuids[result.questionnaire_uuid]
@@ -517,14 +595,15 @@ class RecipeBuilder:
             document_uuid = self._next_uuid_placeholder()
             self._document_uuids[document.uuid] = str(document_uuid)
         name = result.name.replace(" ", "_").lower()
-        self._add_db_script(
-            path=f"documents/{name}_{str(document.uuid)}.sql",
-            data=_document2insert(document_uuid, questionnaire_uuid, result)
+        self._add_script(
+            f"documents/{name}_{str(document.uuid)}.sql",
+            models.Document, [result],
+            overrides={"uuid": quote(document_uuid), "questionnaire_uuid": quote(questionnaire_uuid)},
         )
-        data = self.s3.download_object(f"documents/{str(document.uuid)}")
         self._add_s3_object(
             path=f"documents/{document_uuid}",
             data=data,
+            content_type=result.content_type,
         )
 
     def _add_json_descriptor(self, instruction: schemas.RecipeInstruction):
@@ -553,19 +632,85 @@ class RecipeBuilder:
             },
             "initWait": 20.0
         }
+        self._flush()
+        self.progress.add("entries")
         self.zip_file.writestr(
             zinfo_or_arcname=f"{instruction.name}.seed.json",
             data=json.dumps(data, indent=4),
         )
 
-
-def build_recipe(instruction: schemas.RecipeInstruction, db: Session) -> bytes:
-    buf = io.BytesIO()
-    with zipfile.ZipFile(buf, mode="w", compression=zipfile.ZIP_DEFLATED) as z:
-        builder = RecipeBuilder(
-            tenant_uuid=instruction.tenant_uuid,
-            zip_file=z,
-            db=db,
+    def _add_manifest(self, instruction: schemas.RecipeInstruction):
+        manifest = schemas.RecipeManifest(
+            name=instruction.name,
+            tenantUuid=self.tenant_uuid,
+            createdAt=datetime.datetime.now(tz=datetime.UTC),
+            baseId=self._base_id,
+            entities=self.manifest_entities,
+            entries=self.manifest_entries,
+        )
+        self.progress.add("entries")
+        self.zip_file.writestr(
+            zinfo_or_arcname=f"{instruction.name}.manifest.json",
+            data=manifest.model_dump_json(by_alias=True, indent=4),
         )
-        builder.run(instruction)
-    return buf.getvalue()
+
+
+def read_recipe_manifest(file: str | os.PathLike | IO[bytes]) -> schemas.RecipeManifest:
+    """Read the manifest of a previously built recipe archive (e.g. as base of a delta)."""
+    try:
+        with zipfile.ZipFile(file) as z:
+            names = [name for name in z.namelist() if name.endswith(".manifest.json") and "/" not in name]
+            if not names:
+                raise ValueError("Recipe has no manifest")
+            return schemas.RecipeManifest.model_validate_json(z.read(names[0]))
+    except zipfile.BadZipFile as e:
+        raise ValueError("Not a recipe archive") from e
+
+
+def plan_recipe(instruction: schemas.RecipeInstruction, db: Session) -> RecipePlan:
+    return RecipePlanner(tenant_uuid=instruction.tenant_uuid, db=db).run(instruction)
+
+
+def build_recipe(instruction: schemas.RecipeInstruction, db: Session,
+                 progress: BuildProgress | None = None) -> Iterator[bytes]:
+    # resolve everything upfront so missing entities fail before streaming
+    progress = progress or BuildProgress()
+    with contextlib.ExitStack() as planning:
+        # the build is tracked from planning on, its end is left to the
+        # streaming thread unless planning fails
+        planning.enter_context(progress.track_build())
+        progress.phase = "planning"
+        with progress.track_queries(db), progress.span("plan"):
+            plan = plan_recipe(instruction, db)
+        tracking = planning.pop_all()
+
+    def build(zip_file: zipfile.ZipFile):
+        progress.phase = "writing"
+        with tracking, progress.track_queries(db):
+            builder = RecipeBuilder(
+                tenant_uuid=instruction.tenant_uuid,
+                zip_file=zip_file,
+                db=db,
+                progress=progress,
+            )
+            builder.run(instruction, plan)
+
+    return stream_zip(build, compression=zipfile.ZIP_DEFLATED)
+
+
+def build_recipe_file(instruction: schemas.RecipeInstruction, db: Session, path: str | os.PathLike,
+                      progress: BuildProgress, s3_client: ObjectClient | None = None):
+    with progress.track_build(), progress.track_queries(db):
+        progress.phase = "planning"
+        with progress.span("plan"):
+            plan = plan_recipe(instruction, db)
+        progress.phase = "writing"
+        with zipfile.ZipFile(path, mode="w", compression=zipfile.ZIP_DEFLATED) as z:
+            builder = RecipeBuilder(
+                tenant_uuid=instruction.tenant_uuid,
+                zip_file=z,
+                db=db,
+                progress=progress,
+                s3_client=s3_client,
+            )
+            builder.run(instruction, plan)
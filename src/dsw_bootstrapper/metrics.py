@@ -0,0 +1,78 @@
+import threading
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(key: tuple[tuple[str, str], ...]) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in key) + "}"
+
+
+def _value(value: float) -> str:
+    # exact rather than rounded to a few significant digits, so rates of large
+    # counters (e.g. bytes) do not stall between scrapes
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metrics:
+    """Process-wide counters and timing summaries in the Prometheus text format.
+
+    Counters only ever grow; timings are exposed as summaries (sum and count
+    per label set, no quantiles), which is enough to derive rates and means.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help = {}  # type: dict[str, str]
+        self._counters = {}  # type: dict[str, dict[tuple[tuple[str, str], ...], float]]
+        self._summaries = {}  # type: dict[str, dict[tuple[tuple[str, str], ...], list[float]]]
+
+    def describe(self, name: str, text: str):
+        self._help[name] = text
+
+    def inc(self, name: str, value: float = 1, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._summaries.setdefault(name, {})
+            total = series.setdefault(key, [0.0, 0])
+            total[0] += seconds
+            total[1] += 1
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, counters in sorted(self._counters.items()):
+                lines.extend(self._header(name, "counter"))
+                for key, value in sorted(counters.items()):
+                    lines.append(f"{name}{_labels(key)} {_value(value)}")
+            for name, summaries in sorted(self._summaries.items()):
+                lines.extend(self._header(name, "summary"))
+                for key, (total, count) in sorted(summaries.items()):
+                    lines.append(f"{name}_sum{_labels(key)} {total:.6f}")
+                    lines.append(f"{name}_count{_labels(key)} {_value(count)}")
+        return "\n".join(lines) + "\n"
+
+    def _header(self, name: str, kind: str) -> list[str]:
+        text = self._help.get(name)
+        return ([f"# HELP {name} {text}"] if text else []) + [f"# TYPE {name} {kind}"]
+
+
+metrics = Metrics()
+metrics.describe("recipe_builds_total", "Recipe builds by outcome.")
+metrics.describe("recipe_queries_total", "ORM queries executed by recipe builds.")
+metrics.describe("recipe_rows_total", "Database rows fetched by recipe builds.")
+metrics.describe("recipe_s3_bytes_total", "Bytes of S3 objects read by recipe builds.")
+metrics.describe("recipe_entries_total", "ZIP entries written by recipe builds.")
+metrics.describe("recipe_phase_seconds", "Time spent per recipe build phase (overlapping).")
+metrics.describe("recipe_render_seconds", "Time spent rendering SQL scripts per renderer.")
@@ -1,9 +1,16 @@
 from datetime import datetime
 from uuid import UUID
 
-from sqlalchemy import String, Integer, JSON, DateTime, Uuid, Boolean, ARRAY, BigInteger
+from sqlalchemy import String, Integer, JSON, Uuid, Boolean, ARRAY, BigInteger
 from sqlalchemy.orm import Mapped, mapped_column
-from .db import Base
+from .db import Base, Timestamp
+
+
+# Heavy columns (readme, events, file contents, logs) are deferred in the
+# "payload" group so listings and planning queries do not transfer them;
+# only the recipe renderers undefer them (see `logic.RecipeBuilder`).
+# Types are kept portable to SQLite for offline snapshots (see `snapshot`):
+# arrays are stored as JSON there and timestamps as UTC.
 
 
 class Tenant(Base):
@@ -24,13 +31,13 @@ class Package(Base):
     version: Mapped[str] = mapped_column(String)
     metamodel_version: Mapped[int] = mapped_column(Integer)
     description: Mapped[str] = mapped_column(String)
-    readme: Mapped[str] = mapped_column(String)
+    readme: Mapped[str] = mapped_column(String, deferred=True, deferred_group="payload")
     license: Mapped[str] = mapped_column(String)
     previous_package_id: Mapped[str | None] = mapped_column(String, nullable=True)
     fork_of_package_id: Mapped[str | None] = mapped_column(String, nullable=True)
     merge_checkpoint_package_id: Mapped[str | None] = mapped_column(String, nullable=True)
-    events: Mapped[list] = mapped_column(JSON)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    events: Mapped[list] = mapped_column(JSON, deferred=True, deferred_group="payload")
+    created_at: Mapped[datetime] = mapped_column(Timestamp)
     tenant_uuid: Mapped[UUID] = mapped_column(Uuid)
     phase: Mapped[str] = mapped_column(String)
     non_editable: Mapped[bool] = mapped_column(Boolean)
@@ -46,12 +53,12 @@ class DocumentTemplate(Base):
     version: Mapped[str] = mapped_column(String)
     metamodel_version: Mapped[str] = mapped_column(String)
     description: Mapped[str] = mapped_column(String)
-    readme: Mapped[str] = mapped_column(String)
+    readme: Mapped[str] = mapped_column(String, deferred=True, deferred_group="payload")
     license: Mapped[str] = mapped_column(String)
     allowed_packages: Mapped[list] = mapped_column(JSON)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    created_at: Mapped[datetime] = mapped_column(Timestamp)
     tenant_uuid: Mapped[UUID] = mapped_column(Uuid, primary_key=True)
-    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    updated_at: Mapped[datetime] = mapped_column(Timestamp)
     phase: Mapped[str] = mapped_column(String)
     non_editable: Mapped[bool] = mapped_column(Boolean)
 
@@ -65,8 +72,8 @@ class DocumentTemplateAsset(Base):
     content_type: Mapped[str] = mapped_column(String)
     tenant_uuid: Mapped[UUID] = mapped_column(Uuid, primary_key=True)
     file_size: Mapped[int] = mapped_column(Integer)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
-    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    created_at: Mapped[datetime] = mapped_column(Timestamp)
+    updated_at: Mapped[datetime] = mapped_column(Timestamp)
 
 
 class DocumentTemplateFile(Base):
@@ -75,10 +82,10 @@ class DocumentTemplateFile(Base):
     document_template_id: Mapped[str] = mapped_column(String)
     uuid: Mapped[UUID] = mapped_column(Uuid, primary_key=True)
     file_name: Mapped[str] = mapped_column(String)
-    content: Mapped[str] = mapped_column(String)
+    content: Mapped[str] = mapped_column(String, deferred=True, deferred_group="payload")
     tenant_uuid: Mapped[UUID] = mapped_column(Uuid, primary_key=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
-    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    created_at: Mapped[datetime] = mapped_column(Timestamp)
+    updated_at: Mapped[datetime] = mapped_column(Timestamp)
 
 
 class DocumentTemplateFormat(Base):
@@ -89,8 +96,8 @@ class DocumentTemplateFormat(Base):
     name: Mapped[str] = mapped_column(String)
     icon: Mapped[str] = mapped_column(String)
     tenant_uuid: Mapped[UUID] = mapped_column(Uuid, primary_key=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
-    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    created_at: Mapped[datetime] = mapped_column(Timestamp)
+    updated_at: Mapped[datetime] = mapped_column(Timestamp)
 
 
 class DocumentTemplateFormatStep(Base):
@@ -102,8 +109,8 @@ class DocumentTemplateFormatStep(Base):
     name: Mapped[str] = mapped_column(String)
     options: Mapped[dict] = mapped_column(JSON)
     tenant_uuid: Mapped[UUID] = mapped_column(Uuid, primary_key=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
-    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    created_at: Mapped[datetime] = mapped_column(Timestamp)
+    updated_at: Mapped[datetime] = mapped_column(Timestamp)
 
 
 class Questionnaire(Base):
@@ -114,17 +121,17 @@ class Questionnaire(Base):
     visibility: Mapped[str] = mapped_column(String)
     sharing: Mapped[str] = mapped_column(String)
     package_id: Mapped[str] = mapped_column(String)
-    selected_question_tag_uuids: Mapped[list[UUID]] = mapped_column(ARRAY(Uuid))
+    selected_question_tag_uuids: Mapped[list[UUID]] = mapped_column(ARRAY(Uuid).with_variant(JSON, "sqlite"))
     document_template_id: Mapped[str] = mapped_column(String)
     format_uuid: Mapped[UUID] = mapped_column(Uuid)
     created_by: Mapped[UUID | None] = mapped_column(Uuid, nullable=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
-    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    created_at: Mapped[datetime] = mapped_column(Timestamp)
+    updated_at: Mapped[datetime] = mapped_column(Timestamp)
     description: Mapped[str | None] = mapped_column(String, nullable=True)
     is_template: Mapped[bool] = mapped_column(Boolean)
     squashed: Mapped[bool] = mapped_column(Boolean)
     tenant_uuid: Mapped[UUID] = mapped_column(Uuid, primary_key=True)
-    project_tags: Mapped[list[str]] = mapped_column(ARRAY(String))
+    project_tags: Mapped[list[str]] = mapped_column(ARRAY(String).with_variant(JSON, "sqlite"))
 
 
 class QuestionnaireEvent(Base):
@@ -133,14 +140,14 @@ class QuestionnaireEvent(Base):
     uuid: Mapped[UUID] = mapped_column(Uuid, primary_key=True)
     event_type: Mapped[str] = mapped_column(String)
     path: Mapped[str | None] = mapped_column(String, nullable=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    created_at: Mapped[datetime] = mapped_column(Timestamp)
     created_by: Mapped[UUID | None] = mapped_column(Uuid, nullable=True)
     questionnaire_uuid: Mapped[UUID] = mapped_column(Uuid)
     tenant_uuid: Mapped[UUID] = mapped_column(Uuid)
     value_type: Mapped[str | None] = mapped_column(String, nullable=True)
-    value: Mapped[list[str]] = mapped_column(ARRAY(String), nullable=True)
+    value: Mapped[list[str]] = mapped_column(ARRAY(String).with_variant(JSON, "sqlite"), nullable=True)
     value_id: Mapped[str | None] = mapped_column(String, nullable=True)
-    value_raw: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    value_raw: Mapped[dict | None] = mapped_column(JSON, nullable=True, deferred=True, deferred_group="payload")
 
 
 class QuestionnaireFile(Base):
@@ -153,7 +160,7 @@ class QuestionnaireFile(Base):
     questionnaire_uuid: Mapped[UUID] = mapped_column(Uuid)
     created_by: Mapped[UUID | None] = mapped_column(Uuid, nullable=True)
     tenant_uuid: Mapped[UUID] = mapped_column(Uuid)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    created_at: Mapped[datetime] = mapped_column(Timestamp)
 
 
 class QuestionnaireVersion(Base):
@@ -166,8 +173,8 @@ class QuestionnaireVersion(Base):
     questionnaire_uuid: Mapped[UUID] = mapped_column(Uuid)
     tenant_uuid: Mapped[UUID] = mapped_column(Uuid, primary_key=True)
     created_by: Mapped[UUID | None] = mapped_column(Uuid, nullable=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
-    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    created_at: Mapped[datetime] = mapped_column(Timestamp)
+    updated_at: Mapped[datetime] = mapped_column(Timestamp)
 
 
 class Document(Base):
@@ -186,8 +193,8 @@ class Document(Base):
     file_name: Mapped[str | None] = mapped_column(String, nullable=True)
     content_type: Mapped[str | None] = mapped_column(String, nullable=True)
     file_size: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
-    worker_log: Mapped[str | None] = mapped_column(String, nullable=True)
-    retrieved_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
-    finished_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    worker_log: Mapped[str | None] = mapped_column(String, nullable=True, deferred=True, deferred_group="payload")
+    retrieved_at: Mapped[datetime] = mapped_column(Timestamp, nullable=True)
+    finished_at: Mapped[datetime] = mapped_column(Timestamp, nullable=True)
     tenant_uuid: Mapped[UUID] = mapped_column(Uuid, primary_key=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    created_at: Mapped[datetime] = mapped_column(Timestamp)
@@ -0,0 +1,258 @@
+import collections
+import datetime
+import uuid
+
+from typing import Any, Iterable, NamedTuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, aliased
+
+from . import models, schemas
+
+
+class PlanStep(NamedTuple):
+    kind: schemas.EntityKind
+    entity: Any
+    spec: Any
+
+    @property
+    def entity_id(self) -> str:
+        if self.kind in ("package", "document_template"):
+            return self.entity.id
+        return str(self.entity.uuid)
+
+    @property
+    def updated_at(self) -> datetime.datetime:
+        # packages and documents are immutable
+        if self.kind in ("package", "document"):
+            return self.entity.created_at
+        return self.entity.updated_at
+
+
+class RecipePlan:
+    """Resolved contents of a recipe in the order they are written.
+
+    Entities (and their child rows) are loaded by :class:`RecipePlanner` with
+    a few set-based queries, so rendering does not hit the database per item.
+    """
+
+    def __init__(self):
+        self.steps = []  # type: list[PlanStep]
+        self.dt_assets = {}  # type: dict[str, list[models.DocumentTemplateAsset]]
+        self.dt_files = {}  # type: dict[str, list[models.DocumentTemplateFile]]
+        self.dt_formats = {}  # type: dict[str, list[models.DocumentTemplateFormat]]
+        self.dt_steps = {}  # type: dict[str, list[models.DocumentTemplateFormatStep]]
+        self.questionnaire_files = {}  # type: dict[uuid.UUID, list[models.QuestionnaireFile]]
+        self.questionnaire_versions = {}  # type: dict[uuid.UUID, list[models.QuestionnaireVersion]]
+
+
+def _group_by(rows: Iterable[Any], attr: str) -> dict[Any, list[Any]]:
+    result = collections.defaultdict(list)  # type: dict[Any, list[Any]]
+    for row in rows:
+        result[getattr(row, attr)].append(row)
+    return result
+
+
+class RecipePlanner:
+
+    def __init__(self, tenant_uuid: uuid.UUID, db: Session):
+        self.tenant_uuid = tenant_uuid
+        self.db = db
+        self.plan = RecipePlan()
+        self._packages = {}  # type: dict[str, models.Package]
+        self._document_templates = {}  # type: dict[str, models.DocumentTemplate]
+        self._questionnaires = {}  # type: dict[uuid.UUID, models.Questionnaire]
+        self._documents = {}  # type: dict[uuid.UUID, models.Document]
+        self._added_package_ids = set()  # type: set[str]
+        self._added_document_template_ids = set()  # type: set[str]
+        self._added_questionnaire_uuids = set()  # type: set[uuid.UUID]
+        self._added_document_uuids = set()  # type: set[uuid.UUID]
+
+    def run(self, instruction: schemas.RecipeInstruction) -> RecipePlan:
+        self._load_entities(instruction)
+        for package in instruction.packages:
+            self._add_package(package)
+        for document_template in instruction.document_templates:
+            self._add_document_template(document_template)
+        for questionnaire in instruction.questionnaires:
+            self._add_questionnaire(questionnaire)
+        for document in instruction.documents:
+            self._add_document(document)
+        self._load_children()
+        return self.plan
+
+    def _load_entities(self, instruction: schemas.RecipeInstruction):
+        # load every entity the recipe may need level by level, following
+        # dependencies regardless of flags; the walk below picks what is used
+        self._documents = {
+            doc.uuid: doc for doc in self.db.query(models.Document).filter(
+                models.Document.uuid.in_({d.uuid for d in instruction.documents}),
+                models.Document.tenant_uuid == self.tenant_uuid,
+            )
+        }
+        questionnaire_uuids = {q.uuid for q in instruction.questionnaires}
+        questionnaire_uuids.update(doc.questionnaire_uuid for doc in self._documents.values() if doc.questionnaire_uuid)
+        self._questionnaires = {
+            qtn.uuid: qtn for qtn in self.db.query(models.Questionnaire).filter(
+                models.Questionnaire.uuid.in_(questionnaire_uuids),
+                models.Questionnaire.tenant_uuid == self.tenant_uuid,
+            )
+        }
+        package_ids = {p.id for p in instruction.packages if not p.include_dependencies}
+        package_ids_deps = {p.id for p in instruction.packages if p.include_dependencies}
+        package_ids_deps.update(qtn.package_id for qtn in self._questionnaires.values() if qtn.package_id)
+        self._packages = {
+            pkg.id: pkg for pkg in self._query_packages(package_ids, package_ids_deps)
+        }
+        document_template_ids = {dt.id for dt in instruction.document_templates}
+        document_template_ids.update(
+            qtn.document_template_id for qtn in self._questionnaires.values() if qtn.document_template_id
+        )
+        document_template_ids.update(
+            doc.document_template_id for doc in self._documents.values() if doc.document_template_id
+        )
+        self._document_templates = {
+            dt.id: dt for dt in self.db.query(models.DocumentTemplate).filter(
+                models.DocumentTemplate.id.in_(document_template_ids),
+                models.DocumentTemplate.tenant_uuid == self.tenant_uuid,
+            )
+        }
+
+    def _query_packages(self, package_ids: set[str], package_ids_deps: set[str]) -> list[models.Package]:
+        # single recursive CTE for the whole previous/fork/merge closure
+        package = models.Package
+        closure = select(
+            package.id,
+            package.previous_package_id,
+            package.fork_of_package_id,
+            package.merge_checkpoint_package_id,
+        ).where(
+            package.id.in_(package_ids_deps),
+            package.tenant_uuid == self.tenant_uuid,
+        ).cte("package_closure", recursive=True)
+        parent = aliased(package)
+        closure = closure.union(
+            select(
+                parent.id,
+                parent.previous_package_id,
+                parent.fork_of_package_id,
+                parent.merge_checkpoint_package_id,
+            ).join(
+                closure,
+                parent.id.in_([
+                    closure.c.previous_package_id,
+                    closure.c.fork_of_package_id,
+                    closure.c.merge_checkpoint_package_id,
+                ]),
+            ).where(
+                parent.tenant_uuid == self.tenant_uuid,
+            )
+        )
+        return self.db.query(package).filter(
+            package.tenant_uuid == self.tenant_uuid,
+            package.id.in_(select(closure.c.id)) | package.id.in_(package_ids),
+        ).all()
+
+    def _load_children(self):
+        document_template_ids = self._added_document_template_ids
+        questionnaire_uuids = self._added_questionnaire_uuids
+        versioned_questionnaire_uuids = {
+            step.spec.uuid for step in self.plan.steps
+            if step.kind == "questionnaire" and step.spec.include_versions
+        }
+        self.plan.dt_assets = _group_by(self.db.query(models.DocumentTemplateAsset).filter(
+            models.DocumentTemplateAsset.document_template_id.in_(document_template_ids),
+            models.DocumentTemplateAsset.tenant_uuid == self.tenant_uuid
+        ), "document_template_id")
+        self.plan.dt_files = _group_by(self.db.query(models.DocumentTemplateFile).filter(
+            models.DocumentTemplateFile.document_template_id.in_(document_template_ids),
+            models.DocumentTemplateFile.tenant_uuid == self.tenant_uuid
+        ), "document_template_id")
+        self.plan.dt_formats = _group_by(self.db.query(models.DocumentTemplateFormat).filter(
+            models.DocumentTemplateFormat.document_template_id.in_(document_template_ids),
+            models.DocumentTemplateFormat.tenant_uuid == self.tenant_uuid
+        ), "document_template_id")
+        self.plan.dt_steps = _group_by(self.db.query(models.DocumentTemplateFormatStep).filter(
+            models.DocumentTemplateFormatStep.document_template_id.in_(document_template_ids),
+            models.DocumentTemplateFormatStep.tenant_uuid == self.tenant_uuid
+        ), "document_template_id")
+        self.plan.questionnaire_files = _group_by(self.db.query(models.QuestionnaireFile).filter(
+            models.QuestionnaireFile.questionnaire_uuid.in_(questionnaire_uuids),
+            models.QuestionnaireFile.tenant_uuid == self.tenant_uuid
+        ), "questionnaire_uuid")
+        self.plan.questionnaire_versions = _group_by(self.db.query(models.QuestionnaireVersion).filter(
+            models.QuestionnaireVersion.questionnaire_uuid.in_(versioned_questionnaire_uuids),
+            models.QuestionnaireVersion.tenant_uuid == self.tenant_uuid
+        ), "questionnaire_uuid")
+
+    def _add_package(self, package: schemas.PackageIn):
+        if package.id in self._added_package_ids:
+            return
+        self._added_package_ids.add(package.id)
+        result = self._packages.get(package.id)
+        if result is None:
+            raise ValueError("Package not found")
+        if result.previous_package_id and package.include_dependencies:
+            self._add_package(schemas.PackageIn(
+                id=result.previous_package_id,
+                includeDependencies=package.include_dependencies,
+            ))
+        if result.fork_of_package_id and package.include_dependencies:
+            self._add_package(schemas.PackageIn(
+                id=result.fork_of_package_id,
+                includeDependencies=package.include_dependencies,
+            ))
+        if result.merge_checkpoint_package_id and package.include_dependencies:
+            self._add_package(schemas.PackageIn(
+                id=result.merge_checkpoint_package_id,
+                includeDependencies=package.include_dependencies,
+            ))
+        self.plan.steps.append(PlanStep("package", result, package))
+
+    def _add_document_template(self, document_template: schemas.DocumentTemplateIn):
+        if document_template.id in self._added_document_template_ids:
+            return
+        self._added_document_template_ids.add(document_template.id)
+        result = self._document_templates.get(document_template.id)
+        if result is None:
+            raise ValueError("Document Template not found")
+        self.plan.steps.append(PlanStep("document_template", result, document_template))
+
+    def _add_questionnaire(self, questionnaire: schemas.QuestionnaireIn):
+        if questionnaire.uuid in self._added_questionnaire_uuids:
+            return
+        self._added_questionnaire_uuids.add(questionnaire.uuid)
+        result = self._questionnaires.get(questionnaire.uuid)
+        if result is None:
+            raise ValueError("Questionnaire not found")
+        if result.package_id and questionnaire.include_dependencies:
+            self._add_package(schemas.PackageIn(
+                id=result.package_id,
+                includeDependencies=True,
+            ))
+        if result.document_template_id and questionnaire.include_dependencies:
+            self._add_document_template(schemas.DocumentTemplateIn(
+                id=result.document_template_id,
+            ))
+        self.plan.steps.append(PlanStep("questionnaire", result, questionnaire))
+
+    def _add_document(self, document: schemas.DocumentIn):
+        if document.uuid in self._added_document_uuids:
+            return
+        self._added_document_uuids.add(document.uuid)
+        result = self._documents.get(document.uuid)
+        if result is None:
+            raise ValueError("Document not found")
+        if result.document_template_id and document.include_dependencies:
+            self._add_document_template(schemas.DocumentTemplateIn(
+                id=result.document_template_id,
+            ))
+        if result.questionnaire_uuid and document.include_dependencies:
+            self._add_questionnaire(schemas.QuestionnaireIn(
+                uuid=result.questionnaire_uuid,
+                newUuid=document.new_uuid,
+                anonymize=document.anonymize,
+                includeDependencies=document.include_dependencies,
+                includeVersions=document.include_dependencies,
+            ))
+        self.plan.steps.append(PlanStep("document", result, document))
@@ -1,6 +1,8 @@
-from uuid import UUID
+from datetime import datetime
+from typing import Generic, Literal, Self, TypeVar
+from uuid import UUID, uuid4
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 
 class TenantOut(BaseModel):
@@ -55,6 +57,14 @@ class TenantContents(BaseModel):
     documents: list[DocumentOut] = Field(default_factory=list)
 
 
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    items: list[T] = Field(default_factory=list)
+    next_cursor: str | None = Field(alias="nextCursor", default=None)
+
+
 class PackageIn(BaseModel):
     id: str
     include_dependencies: bool = Field(alias='includeDependencies')
@@ -79,6 +89,58 @@ class DocumentIn(BaseModel):
     include_dependencies: bool = Field(alias="includeDependencies")
 
 
+# levels accepted by the zipfile compressors; lzma and store take none
+_SQL_LEVELS = {"deflate": range(0, 10), "bzip2": range(1, 10)}
+
+
+class CompressionOptions(BaseModel):
+    sql: Literal["deflate", "bzip2", "lzma", "store"] = "deflate"
+    sql_level: int | None = Field(alias="sqlLevel", default=None, ge=0, le=9)
+    files: Literal["auto", "deflate", "store"] = "auto"
+
+    @model_validator(mode="after")
+    def check_sql_level(self) -> Self:
+        # rejected upfront, a streamed recipe cannot report errors any more
+        if self.sql_level is None:
+            return self
+        levels = _SQL_LEVELS.get(self.sql)
+        if levels is None:
+            raise ValueError(f"sqlLevel is not supported for {self.sql}")
+        if self.sql_level not in levels:
+            raise ValueError(f"sqlLevel for {self.sql} must be between {levels[0]} and {levels[-1]}")
+        return self
+
+
+EntityKind = Literal["package", "document_template", "questionnaire", "document"]
+
+
+class ManifestEntity(BaseModel):
+    kind: EntityKind
+    id: str
+    updated_at: datetime = Field(alias="updatedAt")
+    fingerprint: str
+    included: bool = True
+
+
+class ManifestEntry(BaseModel):
+    path: str
+    sha256: str
+    size: int
+    kind: EntityKind
+    entity_id: str = Field(alias="entityId")
+    updated_at: datetime = Field(alias="updatedAt")
+
+
+class RecipeManifest(BaseModel):
+    id: UUID = Field(default_factory=uuid4)
+    name: str
+    tenant_uuid: UUID = Field(alias="tenantUuid")
+    created_at: datetime = Field(alias="createdAt")
+    base_id: UUID | None = Field(alias="baseId", default=None)
+    entities: list[ManifestEntity] = Field(default_factory=list)
+    entries: list[ManifestEntry] = Field(default_factory=list)
+
+
 class RecipeInstruction(BaseModel):
     name: str
     description: str | None = None
@@ -87,3 +149,28 @@ class RecipeInstruction(BaseModel):
     document_templates: list[DocumentTemplateIn] = Field(default_factory=list, alias="documentTemplates")
     questionnaires: list[QuestionnaireIn] = Field(default_factory=list)
     documents: list[DocumentIn] = Field(default_factory=list)
+    sql_format: Literal["insert", "batch"] = Field(default="insert", alias="sqlFormat")
+    base_manifest: RecipeManifest | None = Field(default=None, alias="baseManifest")
+    compression: CompressionOptions = Field(default_factory=CompressionOptions)
+
+
+JobStatus = Literal["queued", "running", "done", "failed"]
+
+
+class RecipeJobProgress(BaseModel):
+    phase: str
+    queries: int
+    rows: int
+    s3_bytes: int = Field(alias="s3Bytes")
+    entries: int
+    timings: dict[str, float] = Field(default_factory=dict)
+
+
+class RecipeJobOut(BaseModel):
+    id: UUID
+    status: JobStatus
+    error: str | None = None
+    progress: RecipeJobProgress
+    created_at: datetime = Field(alias="createdAt")
+    finished_at: datetime | None = Field(alias="finishedAt", default=None)
+    expires_at: datetime | None = Field(alias="expiresAt", default=None)
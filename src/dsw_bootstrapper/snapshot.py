@@ -0,0 +1,151 @@
+import concurrent.futures
+import datetime
+import json
+import os
+import pathlib
+import uuid
+
+from typing import Any, Callable, Iterator
+
+import minio.error
+
+from sqlalchemy import ARRAY, Table, create_engine, delete, insert, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from . import contents, models
+from .config import Config
+from .db import Base
+from .storage import LocalObjectStore, S3Storage
+
+
+# A snapshot is a directory with the tables of `models` for selected tenants
+# in a SQLite database and the S3 objects they reference as plain files, so
+# recipes can be built offline without touching the live DSW instance:
+#
+#   dsw.sqlite            rows of the snapshotted tenants
+#   objects/<object key>  S3 objects (keys including the tenant prefix)
+#   snapshot.json         when and from which tenants it was taken
+
+_DUMP_BATCH_SIZE = 5000
+
+
+class Snapshot:
+
+    DATABASE = "dsw.sqlite"
+    OBJECTS = "objects"
+    INFO = "snapshot.json"
+
+    def __init__(self, directory: str | os.PathLike):
+        self.directory = pathlib.Path(directory)
+        # connects (creating the database file) only on first use
+        self.engine = create_engine(f"sqlite:///{self.directory / self.DATABASE}")
+
+    def exists(self) -> bool:
+        return (self.directory / self.DATABASE).is_file()
+
+    def session(self) -> Session:
+        if not self.exists():
+            raise FileNotFoundError(f"No snapshot in {self.directory}")
+        return sessionmaker(bind=self.engine, autoflush=False, expire_on_commit=False)()
+
+    def object_store(self) -> LocalObjectStore:
+        return LocalObjectStore(self.directory / self.OBJECTS)
+
+    def info(self) -> dict[str, Any]:
+        return json.loads((self.directory / self.INFO).read_text(encoding="utf-8"))
+
+    def dump(self, db: Session, tenant_uuids: list[uuid.UUID],
+             log: Callable[[str], None] = print) -> dict[str, int]:
+        """Copy rows and objects of the tenants from the live database and S3.
+
+        Tenants already in the snapshot are replaced; objects present with
+        the recorded size are kept rather than downloaded again. Returns the
+        number of rows per table and of objects downloaded, kept and missing.
+        """
+        (self.directory / self.OBJECTS).mkdir(parents=True, exist_ok=True)
+        Base.metadata.create_all(self.engine)
+        counts = {}  # type: dict[str, int]
+        with self.engine.begin() as snapshot:
+            for table in Base.metadata.sorted_tables:
+                key = table.c.uuid if table.name == models.Tenant.__tablename__ else table.c.tenant_uuid
+                snapshot.execute(delete(table).where(key.in_(tenant_uuids)))
+                counts[table.name] = 0
+                result = db.execute(select(table).where(key.in_(tenant_uuids)).execution_options(yield_per=_DUMP_BATCH_SIZE))
+                for rows in result.mappings().partitions():
+                    snapshot.execute(insert(table), [self._row(table, row) for row in rows])
+                    counts[table.name] += len(rows)
+                log(f"{table.name}: {counts[table.name]} rows")
+        for name, value in self._dump_objects(tenant_uuids).items():
+            counts[f"objects_{name}"] = value
+        log(f"objects: {counts['objects_downloaded']} downloaded, {counts['objects_kept']} kept, "
+            f"{counts['objects_missing']} missing")
+        info = self.info() if (self.directory / self.INFO).is_file() else {"tenants": {}}
+        for tenant_uuid in tenant_uuids:
+            info["tenants"][str(tenant_uuid)] = datetime.datetime.now(tz=datetime.UTC).isoformat()
+        (self.directory / self.INFO).write_text(json.dumps(info, indent=2), encoding="utf-8")
+        return counts
+
+    @staticmethod
+    def _row(table: Table, row: Any) -> dict[str, Any]:
+        values = dict(row)
+        for column in table.columns:
+            # arrays are JSON in SQLite, which has no UUID type
+            if isinstance(column.type, ARRAY) and values[column.key] is not None:
+                values[column.key] = [str(item) if isinstance(item, uuid.UUID) else item for item in values[column.key]]
+        return values
+
+    def _object_paths(self, tenant_uuid: uuid.UUID) -> Iterator[tuple[str, int | None]]:
+        # same object paths as read by `logic.RecipeBuilder`
+        with self.session() as db:
+            assets = db.execute(
+                select(models.DocumentTemplateAsset.document_template_id, models.DocumentTemplateAsset.uuid,
+                       models.DocumentTemplateAsset.file_size)
+                .where(models.DocumentTemplateAsset.tenant_uuid == tenant_uuid)
+            )
+            for template_id, asset_uuid, size in assets:
+                yield f"templates/{template_id}/{asset_uuid}", size
+            files = db.execute(
+                select(models.QuestionnaireFile.questionnaire_uuid, models.QuestionnaireFile.uuid,
+                       models.QuestionnaireFile.file_size)
+                .where(models.QuestionnaireFile.tenant_uuid == tenant_uuid)
+            )
+            for questionnaire_uuid, file_uuid, size in files:
+                yield f"questionnaire-files/{questionnaire_uuid}/{file_uuid}", size
+            documents = db.execute(
+                select(models.Document.uuid, models.Document.file_size)
+                .where(models.Document.tenant_uuid == tenant_uuid, *contents.CONTENT_KINDS["documents"].conditions)
+            )
+            for document_uuid, size in documents:
+                yield f"documents/{document_uuid}", size
+
+    def _dump_objects(self, tenant_uuids: list[uuid.UUID]) -> dict[str, int]:
+        counts = {"downloaded": 0, "kept": 0, "missing": 0}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=Config.S3_CONCURRENCY) as executor:
+            futures = []  # type: list[concurrent.futures.Future[str]]
+            for tenant_uuid in tenant_uuids:
+                storage = S3Storage(str(tenant_uuid))
+                futures.extend(executor.submit(self._dump_object, storage, path, size)
+                               for path, size in self._object_paths(tenant_uuid))
+            for future in concurrent.futures.as_completed(futures):
+                counts[future.result()] += 1
+        return counts
+
+    def _dump_object(self, storage: S3Storage, path: str, size: int | None) -> str:
+        stream = storage.stream_object(path)
+        target = self.directory / self.OBJECTS / stream.object_name
+        if size is not None and target.is_file() and target.stat().st_size == size:
+            return "kept"
+        target.parent.mkdir(parents=True, exist_ok=True)
+        partial = target.with_name(target.name + ".part")
+        try:
+            with partial.open("wb") as f:
+                for chunk in stream.chunks():
+                    f.write(chunk)
+        except minio.error.S3Error as e:
+            partial.unlink(missing_ok=True)
+            if e.code != "NoSuchKey":
+                raise
+            # deleted from S3 after the row was written, left out of the snapshot
+            return "missing"
+        partial.replace(target)
+        return "downloaded"
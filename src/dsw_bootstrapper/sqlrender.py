@@ -0,0 +1,174 @@
+import datetime
+import functools
+import json
+import operator
+import time
+
+from typing import Any, Callable, Iterable, Iterator
+
+from sqlalchemy import ARRAY, JSON, Boolean, DateTime, Integer, String, Table, Uuid
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.types import TypeDecorator
+
+from .db import Base
+from .zipstream import CompressedEntry, compress_entry
+
+
+# INSERT statements are rendered straight from the table definitions of
+# `models`: every column gets a literal formatter picked by its type, and
+# per table these are compiled into one function formatting the VALUES tuple
+# of a row as a single f-string, the common ones inlined to skip calls.
+
+
+def quote(value: Any) -> str:
+    if value is None:
+        return "NULL"
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _int(value: int | None) -> str:
+    return "NULL" if value is None else str(int(value))
+
+
+def _bool(value: bool | None) -> str:
+    if value is None:
+        return "NULL"
+    return "TRUE" if value else "FALSE"
+
+
+def _uuid(value: Any) -> str:
+    return "NULL" if value is None else f"'{value}'"
+
+
+def _timestamp(value: datetime.datetime | None) -> str:
+    return "NULL" if value is None else f"'{value.isoformat()}'"
+
+
+def _json(value: Any) -> str:
+    return "NULL" if value is None else quote(json.dumps(value))
+
+
+def _array(item_type: str) -> Callable[[list | None], str]:
+    def format_array(values: list | None) -> str:
+        if values is None:
+            return "NULL"
+        if not values:
+            return "'{}'"
+        return "ARRAY[" + ", ".join([quote(value) for value in values]) + f"]::{item_type}[]"
+
+    return format_array
+
+
+# inline f-string expressions of the formatters above for the value `{v}`
+# (of the column type, e.g. always `str` for strings)
+_INLINE = {
+    quote: "('NULL' if {v} is None else _Q + {v}.replace(_Q, _QQ) + _Q)",
+    _int: "('NULL' if {v} is None else str({v}))",
+    _bool: "('NULL' if {v} is None else 'TRUE' if {v} else 'FALSE')",
+    _uuid: "('NULL' if {v} is None else _Q + str({v}) + _Q)",
+    _timestamp: "('NULL' if {v} is None else _Q + {v}.isoformat() + _Q)",
+}  # type: dict[Callable[[Any], str], str]
+
+
+def _formatter(column_type: Any) -> Callable[[Any], str]:
+    if isinstance(column_type, TypeDecorator):
+        column_type = column_type.impl_instance
+    if isinstance(column_type, ARRAY):
+        return _array(column_type.item_type.compile(dialect=postgresql.dialect()))
+    if isinstance(column_type, JSON):
+        return _json
+    if isinstance(column_type, Boolean):
+        return _bool
+    if isinstance(column_type, Integer):
+        return _int
+    if isinstance(column_type, Uuid):
+        return _uuid
+    if isinstance(column_type, DateTime):
+        return _timestamp
+    if isinstance(column_type, String):
+        return quote
+    raise TypeError(f"No SQL literal formatter for {column_type!r}")
+
+
+class InsertRenderer:
+    """INSERT statements for rows of one table with literals formatted per column type.
+
+    Rows are read by attribute, so ORM entities and `Row` objects of a
+    column select both work. Columns given as `overrides` (already rendered
+    SQL such as the tenant placeholder) are not read from the rows at all.
+    """
+
+    def __init__(self, table: Table):
+        self.table = table
+        self.columns = [column.key for column in table.columns]
+        self.formatters = {column.key: _formatter(column.type) for column in table.columns}
+        self.prefix = f"INSERT INTO {table.name} ({', '.join(column.name for column in table.columns)}) VALUES "
+        self._compiled = {}  # type: dict[tuple[str, ...], Callable[..., Iterator[str]]]
+
+    def _compile(self, overridden: tuple[str, ...]) -> Callable[..., Iterator[str]]:
+        # format_rows(rows, *override values) yielding the VALUES tuple per row
+        read = [column for column in self.columns if column not in overridden]
+        namespace = {"_Q": "'", "_QQ": "''", "getter": operator.attrgetter(*read) if read else None}  # type: dict[str, Any]
+        values = []
+        for column in self.columns:
+            if column in overridden:
+                values.append(f"{{o{overridden.index(column)}}}")
+                continue
+            name = f"c{read.index(column)}"
+            expression = _INLINE.get(self.formatters[column])
+            if expression is None:
+                namespace[f"format_{name}"] = self.formatters[column]
+                expression = f"format_{name}({{v}})"
+            values.append("{" + expression.format(v=name) + "}")
+        targets = "_" if not read else ", ".join(f"c{i}" for i in range(len(read)))
+        source = (
+            f"def format_rows(rows, {''.join(f'o{i}, ' for i in range(len(overridden)))}):\n"
+            f"    for {targets} in {'map(getter, rows)' if read else 'rows'}:\n"
+            f"        yield f\"({', '.join(values)})\"\n"
+        )
+        exec(compile(source, f"<insert {self.table.name}>", "exec"), namespace)  # pylint: disable=exec-used
+        return namespace["format_rows"]
+
+    def iter_inserts(self, rows: Iterable[Any], batch_size: int = 1,
+                     overrides: dict[str, str] | None = None) -> Iterator[str]:
+        """Yield one statement of up to `batch_size` VALUES tuples at a time."""
+        overrides = {column: value for column, value in (overrides or {}).items() if column in self.formatters}
+        overridden = tuple(overrides)
+        format_rows = self._compiled.get(overridden)
+        if format_rows is None:
+            format_rows = self._compiled[overridden] = self._compile(overridden)
+        if batch_size == 1:
+            for values in format_rows(rows, *overrides.values()):
+                yield self.prefix + values + ";\n"
+            return
+        batch = []  # type: list[str]
+        for values in format_rows(rows, *overrides.values()):
+            batch.append(values)
+            if len(batch) >= batch_size:
+                yield self.prefix + ",\n".join(batch) + ";\n"
+                batch.clear()
+        if batch:
+            yield self.prefix + ",\n".join(batch) + ";\n"
+
+
+@functools.cache
+def insert_renderer(model: type[Base]) -> InsertRenderer:
+    return InsertRenderer(model.__table__)  # type: ignore[arg-type]
+
+
+def render_inserts(model: type[Base], rows: Iterable[Any], batch_size: int = 1,
+                   overrides: dict[str, str] | None = None) -> str:
+    return "".join(insert_renderer(model).iter_inserts(rows, batch_size, overrides))
+
+
+def render_entry(model: type[Base], rows: list, batch_size: int, overrides: dict[str, str],
+                 compression: tuple[int, int | None]) -> tuple[CompressedEntry, float, float]:
+    # run by the render pool of `logic`, whose spawned workers import only
+    # this module and what it needs, so it must not import app singletons
+    # (caches, S3 clients, engines); timings are returned as render workers
+    # cannot update the parent progress
+    start = time.perf_counter()
+    data = render_inserts(model, rows, batch_size, overrides).encode("utf-8")
+    rendered = time.perf_counter()
+    entry = compress_entry(data, *compression)
+    return entry, rendered - start, time.perf_counter() - rendered
@@ -15,59 +15,76 @@ $(function () {
         loadContents($(this).val());
     });
 
-    function loadPackages(data) {
-        const $list = $('#packages-list');
-        $list.empty();
-        data.packages.forEach(p => {
-            $list.append(`<li class="list-group-item"><label><input type="checkbox" value="${p.id}" class="form-check-input me-2"> ${p.name} (<code>${p.id}</code>)</label></li>`);
-        });
-        if (data.packages.length === 0) {
-            $list.append('<li class="list-group-item">No packages available.</li>');
-        }
-    }
+    const PAGE_SIZE = 100;
 
-    function loadDocumentTemplates(data) {
-        const $list = $('#document-templates-list');
-        $list.empty();
-        data.documentTemplates.forEach(dt => {
-            $list.append(`<li class="list-group-item"><label><input type="checkbox" value="${dt.id}" class="form-check-input me-2"> ${dt.name} (<code>${dt.id}</code>)</label></li>`);
-        });
-        if (data.documentTemplates.length === 0) {
-            $list.append('<li class="list-group-item">No document templates available.</li>');
-        }
-    }
+    const LISTS = {
+        packages: {
+            el: '#packages-list',
+            empty: 'No packages available.',
+            render: p => `<li class="list-group-item"><label><input type="checkbox" value="${p.id}" class="form-check-input me-2"> ${p.name} (<code>${p.id}</code>)</label></li>`,
+        },
+        documentTemplates: {
+            el: '#document-templates-list',
+            empty: 'No document templates available.',
+            render: dt => `<li class="list-group-item"><label><input type="checkbox" value="${dt.id}" class="form-check-input me-2"> ${dt.name} (<code>${dt.id}</code>)</label></li>`,
+        },
+        questionnaires: {
+            el: '#questionnaires-list',
+            empty: 'No projects available.',
+            render: q => `<li class="list-group-item"><label><input type="checkbox" value="${q.uuid}" class="form-check-input me-2"> ${q.name} (<code>${q.uuid}</code>, KM: <code>${q.packageId}</code>)</label></li>`,
+        },
+        documents: {
+            el: '#documents-list',
+            empty: 'No documents available.',
+            render: d => `<li class="list-group-item"><label><input type="checkbox" value="${d.uuid}" class="form-check-input me-2"> ${d.name} (<code>${d.uuid}</code>, DT: <code>${d.documentTemplateId}</code>)</label></li>`,
+        },
+    };
 
-    function loadQuestionnaires(data) {
-        const $list = $('#questionnaires-list');
-        $list.empty();
-        data.questionnaires.forEach(q => {
-            $list.append(`<li class="list-group-item"><label><input type="checkbox" value="${q.uuid}" class="form-check-input me-2"> ${q.name} (<code>${q.uuid}</code>, KM: <code>${q.packageId}</code>)</label></li>`);
-        });
-        if (data.questionnaires.length === 0) {
-            $list.append('<li class="list-group-item">No projects available.</li>');
+    function loadList(uuid, kind, cursor) {
+        const list = LISTS[kind];
+        const $list = $(list.el);
+        const params = {limit: PAGE_SIZE};
+        const q = $('#contents-search').val();
+        if (q) {
+            params.q = q;
         }
-    }
-
-    function loadDocuments(data) {
-        const $list = jQuery('#documents-list');
-        $list.empty();
-        data.documents.forEach(d => {
-            $list.append(`<li class="list-group-item"><label><input type="checkbox" value="${d.uuid}" class="form-check-input me-2"> ${d.name} (<code>${d.uuid}</code>, DT: <code>${d.documentTemplateId}</code>)</label></li>`);
-        });
-        if (data.documents.length === 0) {
-            $list.append('<li class="list-group-item">No documents available.</li>');
+        if (cursor) {
+            params.cursor = cursor;
         }
+        $.getJSON(`/api/tenants/${uuid}/contents/${kind}`, params, function (page) {
+            if (!cursor) {
+                $list.empty();
+            }
+            $list.find('.load-more').remove();
+            page.items.forEach(item => {
+                $list.append(list.render(item));
+            });
+            if (page.nextCursor) {
+                const $more = $('<li class="list-group-item load-more"><button type="button" class="btn btn-sm btn-outline-secondary">Load more</button></li>');
+                $more.find('button').click(function () {
+                    loadList(uuid, kind, page.nextCursor);
+                });
+                $list.append($more);
+            } else if ($list.children().length === 0) {
+                $list.append(`<li class="list-group-item">${list.empty}</li>`);
+            }
+        });
     }
 
     function loadContents(uuid) {
-        $.getJSON(`/api/tenants/${uuid}/contents`, function (data) {
-            loadPackages(data);
-            loadDocumentTemplates(data);
-            loadQuestionnaires(data);
-            loadDocuments(data);
+        Object.keys(LISTS).forEach(kind => {
+            loadList(uuid, kind, null);
         });
     }
 
+    let searchTimeout = null;
+    $('#contents-search').on('input', function () {
+        clearTimeout(searchTimeout);
+        searchTimeout = setTimeout(function () {
+            loadContents($('#tenant-select').val());
+        }, 300);
+    });
+
     $('#build-btn').click(function () {
         const tenantUuid = $('#tenant-select').val();
         const packages = [];
@@ -110,23 +127,62 @@ $(function () {
             documentTemplates: documentTemplates,
             questionnaires: questionnaires,
             documents: documents,
+            sqlFormat: $('#recipe-sql-format').val(),
         };
+        const baseFile = $('#recipe-base')[0].files[0];
+        if (!baseFile) {
+            submitJob(body);
+            return;
+        }
         $.ajax({
-            url: '/api/recipe',
+            url: '/api/recipe/manifest',
+            method: 'POST',
+            contentType: 'application/zip',
+            processData: false,
+            data: baseFile,
+            success: function (manifest) {
+                body.baseManifest = manifest;
+                submitJob(body);
+            },
+            error: function () {
+                $('#result').html('<div class="alert alert-danger">Failed to read the base recipe.</div>');
+            }
+        });
+    });
+
+    function submitJob(body) {
+        $.ajax({
+            url: '/api/recipe/jobs',
             method: 'POST',
             contentType: 'application/json',
             data: JSON.stringify(body),
-            xhrFields: {responseType: 'blob'},
-            success: function (blob) {
-                const link = document.createElement('a');
-                link.href = window.URL.createObjectURL(blob);
-                link.download = 'seed-recipe.zip';
-                link.click();
-                $('#result').html('<div class="alert alert-success">Recipe built and downloaded.</div>');
+            success: function (job) {
+                pollJob(job.id);
             },
             error: function () {
                 $('#result').html('<div class="alert alert-danger">Failed to build recipe.</div>');
             }
         });
-    });
+    }
+
+    function pollJob(jobId) {
+        $.getJSON(`/api/recipe/jobs/${jobId}`, function (job) {
+            const p = job.progress;
+            if (job.status === 'done') {
+                window.location.href = `/api/recipe/jobs/${jobId}/download`;
+                const seconds = (p.timings.build || 0).toFixed(1);
+                $('#result').html(`<div class="alert alert-success">Recipe built in ${seconds} s (${p.queries} queries, ${p.rows} rows) and downloaded.</div>`);
+            } else if (job.status === 'failed') {
+                $('#result').html(`<div class="alert alert-danger">Failed to build recipe: ${job.error}</div>`);
+            } else {
+                const mb = (p.s3Bytes / 1024 / 1024).toFixed(1);
+                $('#result').html(`<div class="alert alert-info">Building recipe (${p.phase}): ${p.queries} queries, ${p.rows} rows, ${mb} MB from S3, ${p.entries} entries written.</div>`);
+                setTimeout(function () {
+                    pollJob(jobId);
+                }, 1000);
+            }
+        }).fail(function () {
+            $('#result').html('<div class="alert alert-danger">Failed to build recipe.</div>');
+        });
+    }
 });
\ No newline at end of file
@@ -0,0 +1,251 @@
+import collections
+import concurrent.futures
+import contextlib
+import itertools
+import mmap
+import os
+import pathlib
+import threading
+
+from typing import TYPE_CHECKING, Generator, Iterable, Iterator
+
+import certifi
+import minio
+import urllib3
+
+from .cache import blob_store
+from .config import Config
+
+if TYPE_CHECKING:
+    from .logic import BuildProgress
+
+
+_S3_CHUNK_SIZE = 1024 * 1024
+
+_S3_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+    max_workers=Config.S3_CONCURRENCY,
+    thread_name_prefix="s3-download",
+)
+
+
+class S3Clients:
+    """Process-wide registry of S3 clients, one per endpoint and credentials.
+
+    Minio clients are thread-safe, so every build (of any tenant, as tenants
+    differ only in the object prefix) shares one client and its urllib3 pool
+    with keep-alive connections instead of handshaking again per request.
+    """
+
+    def __init__(self):
+        self._clients = {}  # type: dict[tuple[str, str, str], minio.Minio]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _get_endpoint(url: str):
+        parts = url.split('://', maxsplit=1)
+        return parts[0] if len(parts) == 1 else parts[1]
+
+    @staticmethod
+    def _http_client() -> urllib3.PoolManager:
+        # same as the minio default, but with enough pooled connections
+        # for all concurrent downloads to keep their connection alive
+        return urllib3.PoolManager(
+            maxsize=Config.S3_POOL_SIZE,
+            timeout=urllib3.Timeout(connect=Config.S3_CONNECT_TIMEOUT, read=Config.S3_READ_TIMEOUT),
+            cert_reqs="CERT_REQUIRED",
+            ca_certs=os.environ.get("SSL_CERT_FILE") or certifi.where(),
+            retries=urllib3.Retry(
+                total=Config.S3_RETRIES,
+                backoff_factor=Config.S3_RETRY_BACKOFF,
+                status_forcelist=[500, 502, 503, 504],
+            ),
+        )
+
+    def get(self, url: str, access_key: str, secret_key: str, region: str) -> minio.Minio:
+        key = (url, access_key, region)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = minio.Minio(
+                    endpoint=self._get_endpoint(url),
+                    access_key=access_key,
+                    secret_key=secret_key,
+                    secure=url.startswith('https://'),
+                    region=region,
+                    http_client=self._http_client(),
+                )
+                self._clients[key] = client
+            return client
+
+
+s3_clients = S3Clients()
+
+
+class LocalObjectStore:
+    """Read-only stand-in for a `minio.Minio` client serving objects from a directory.
+
+    Objects are plain files named by object key (the bucket is ignored), as
+    written by `snapshot.Snapshot.dump`.
+    """
+
+    def __init__(self, directory: pathlib.Path):
+        self.directory = directory
+
+    def _file(self, object_name: str) -> pathlib.Path:
+        path = self.directory / object_name
+        if not path.resolve().is_relative_to(self.directory.resolve()):
+            raise ValueError(f"Object name outside of the store: {object_name}")
+        return path
+
+    def _etag(self, stat: os.stat_result) -> str:
+        return f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+
+    def get_object(self, bucket_name: str, object_name: str) -> urllib3.HTTPResponse:  # pylint: disable=unused-argument
+        path = self._file(object_name)
+        stat = path.stat()
+        return urllib3.HTTPResponse(
+            body=path.open("rb"),
+            headers={"ETag": self._etag(stat), "Content-Length": str(stat.st_size)},
+            status=200,
+            preload_content=False,
+        )
+
+    def stat_object(self, bucket_name: str, object_name: str) -> minio.datatypes.Object:
+        stat = self._file(object_name).stat()
+        return minio.datatypes.Object(bucket_name, object_name, etag=self._etag(stat), size=stat.st_size)
+
+
+ObjectClient = minio.Minio | LocalObjectStore
+
+
+class S3Stream:
+    """S3 object too large to be held in memory, read in chunks on demand."""
+
+    def __init__(self, storage: "S3Storage", object_name: str):
+        self.storage = storage
+        self.object_name = object_name
+
+    def chunks(self) -> Iterator[bytes]:
+        response = self.storage.client.get_object(
+            bucket_name=self.storage.bucket,
+            object_name=self.object_name,
+        )
+        try:
+            for chunk in response.stream(_S3_CHUNK_SIZE):
+                if self.storage.progress is not None:
+                    self.storage.progress.add("s3_bytes", len(chunk))
+                yield chunk
+        finally:
+            response.close()
+            response.release_conn()
+
+
+class S3Storage:
+
+    def __init__(self, tenant_uuid: str, progress: "BuildProgress | None" = None,
+                 client: ObjectClient | None = None):
+        # objects of a given client (e.g. a local snapshot) are not copied
+        # into the blob store, only those downloaded from the configured S3
+        self.blob_store = blob_store if client is None else None
+        self.client = client or s3_clients.get(
+            url=Config.S3_URL,
+            access_key=Config.S3_ACCESS_KEY,
+            secret_key=Config.S3_SECRET_KEY,
+            region=Config.S3_REGION,
+        )
+        self.tenant_uuid = tenant_uuid
+        self.bucket = Config.S3_BUCKET
+        self.progress = progress
+
+    def _path(self, path: str) -> str:
+        if self.tenant_uuid == "00000000-0000-0000-0000-000000000000":
+            return path
+        return f"{self.tenant_uuid}/{path}"
+
+    def _get_object(self, object_name: str) -> tuple[bytes, str]:
+        response = self.client.get_object(
+            bucket_name=self.bucket,
+            object_name=object_name,
+        )
+        data = response.read()
+        etag = response.headers.get("ETag", "").replace('"', "")
+        response.close()
+        response.release_conn()
+        if self.progress is not None:
+            self.progress.add("s3_bytes", len(data))
+        return data, etag
+
+    def stream_object(self, path: str) -> S3Stream:
+        return S3Stream(self, self._path(path))
+
+    def download_object(self, path: str, version: str | None = None,
+                        size: int | None = None) -> bytes | mmap.mmap | S3Stream:
+        """Download object contents, served from the local blob store if enabled.
+
+        Cached content is validated against the object ETag unless `version`
+        matches the one it was stored with (for objects immutable per version).
+        The returned memory map (if any) can be passed on without copying.
+        Objects over `S3_STREAM_THRESHOLD` bytes are not downloaded (nor
+        cached) here but returned as a stream to be copied in chunks.
+        """
+        with self.progress.span("s3") if self.progress is not None else contextlib.nullcontext():
+            return self._download_object(path, version, size)
+
+    def _download_object(self, path: str, version: str | None, size: int | None) -> bytes | mmap.mmap | S3Stream:
+        object_name = self._path(path)
+        if size is not None and size > Config.S3_STREAM_THRESHOLD:
+            return S3Stream(self, object_name)
+        if self.blob_store is None:
+            return self._get_object(object_name)[0]
+        ref_name = f"{self.bucket}/{object_name}"
+        cached = self.blob_store.open(ref_name, version=version) if version else None
+        if cached is None:
+            etag = self.client.stat_object(
+                bucket_name=self.bucket,
+                object_name=object_name,
+            ).etag
+            cached = self.blob_store.open(ref_name, etag=etag, version=version)
+        if cached is not None:
+            return cached
+        data, etag = self._get_object(object_name)
+        self.blob_store.store(ref_name, data, etag=etag, version=version)
+        return data
+
+    def download_objects(self, paths: Iterable[str], versions: Iterable[str | None] | None = None,
+                         sizes: Iterable[int | None] | None = None) -> Generator[bytes | mmap.mmap | S3Stream, None, None]:
+        """Download objects concurrently, yielding their contents in order of `paths`.
+
+        The first downloads are started right away rather than on iteration,
+        so objects can be prefetched before they are needed. At most twice
+        `S3_CONCURRENCY` objects are fetched ahead of the consumer so memory
+        stays bounded even for templates with many assets.
+        """
+        paths = list(paths)
+        downloads = self._download_objects(
+            paths,
+            list(versions) if versions is not None else [None] * len(paths),
+            list(sizes) if sizes is not None else [None] * len(paths),
+        )
+        next(downloads)  # submits the first window
+        return downloads  # type: ignore[return-value]
+
+    def _download_objects(self, paths: list[str], versions: list[str | None],
+                          sizes: list[int | None]) -> Generator[bytes | mmap.mmap | S3Stream | None, None, None]:
+        window = 2 * Config.S3_CONCURRENCY
+        requests = zip(paths, versions, sizes)
+        pending = collections.deque()  # type: collections.deque[concurrent.futures.Future[bytes | mmap.mmap | S3Stream]]
+
+        def submit():
+            for path, version, size in itertools.islice(requests, window - len(pending)):
+                pending.append(_S3_EXECUTOR.submit(self.download_object, path, version, size))
+
+        try:
+            submit()
+            yield None
+            while pending:
+                future = pending.popleft()
+                submit()
+                yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
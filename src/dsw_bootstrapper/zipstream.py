@@ -0,0 +1,166 @@
+import hashlib
+import io
+import queue
+import struct
+import threading
+import time
+import zipfile
+import zlib
+
+from typing import Callable, Iterator, NamedTuple
+
+CHUNK_SIZE = 64 * 1024
+MAX_PENDING_CHUNKS = 16
+
+_ENTRY_HEADER = struct.Struct("<IQB32s")
+
+
+class ZipStreamCancelled(Exception):
+    pass
+
+
+class CompressedEntry(NamedTuple):
+    """ZIP entry data compressed ahead of writing it into an archive."""
+    data: bytes
+    crc: int
+    file_size: int
+    compress_type: int
+    sha256: bytes  # digest of the uncompressed data
+
+    def to_bytes(self) -> bytes:
+        return _ENTRY_HEADER.pack(self.crc, self.file_size, self.compress_type, self.sha256) + self.data
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CompressedEntry":
+        crc, file_size, compress_type, sha256 = _ENTRY_HEADER.unpack_from(data)
+        return cls(data[_ENTRY_HEADER.size:], crc, file_size, compress_type, sha256)
+
+
+def compress_entry(data: bytes, compress_type: int, compresslevel: int | None = None) -> CompressedEntry:
+    # pylint: disable-next=protected-access
+    compressor = zipfile._get_compressor(compress_type, compresslevel)  # type: ignore[attr-defined]
+    compressed = data if compressor is None else compressor.compress(data) + compressor.flush()
+    return CompressedEntry(compressed, zlib.crc32(data), len(data), compress_type, hashlib.sha256(data).digest())
+
+
+def write_compressed(zip_file: zipfile.ZipFile, arcname: str, entry: CompressedEntry):
+    """Write an entry compressed beforehand (e.g. in another process) into `zip_file`.
+
+    This mirrors what :meth:`zipfile.ZipFile.writestr` does but skips the
+    compressor; as the CRC and sizes are known upfront, the local header is
+    final and no data descriptor is needed even for non-seekable streams.
+    """
+    zinfo = zipfile.ZipInfo(filename=arcname, date_time=time.localtime(time.time())[:6])
+    zinfo.compress_type = entry.compress_type
+    zinfo.external_attr = 0o600 << 16
+    zinfo.file_size = entry.file_size
+    zinfo.compress_size = len(entry.data)
+    zinfo.CRC = entry.crc
+    if entry.compress_type == zipfile.ZIP_LZMA:
+        zinfo.flag_bits |= 0x02  # compressed data includes an end-of-stream marker
+    # pylint: disable=protected-access
+    with zip_file._lock:  # type: ignore[attr-defined]
+        if zip_file._writing:  # type: ignore[attr-defined]
+            raise ValueError("Can't write to ZIP archive while an open writing handle exists.")
+        if zip_file._seekable:  # type: ignore[attr-defined]
+            zip_file.fp.seek(zip_file.start_dir)  # type: ignore[union-attr]
+        zinfo.header_offset = zip_file.fp.tell()  # type: ignore[union-attr]
+        zip_file._writecheck(zinfo)  # type: ignore[attr-defined]
+        zip_file._didModify = True  # type: ignore[attr-defined]
+        zip_file.fp.write(zinfo.FileHeader())  # type: ignore[union-attr]
+        zip_file.fp.write(entry.data)  # type: ignore[union-attr]
+        zip_file.start_dir = zip_file.fp.tell()  # type: ignore[union-attr]
+        zip_file.filelist.append(zinfo)
+        zip_file.NameToInfo[zinfo.filename] = zinfo
+
+
+class ZipStream(io.RawIOBase):
+    """Write-only, non-seekable sink handing written bytes over in chunks.
+
+    As it is not seekable, :class:`zipfile.ZipFile` writes entries with data
+    descriptors (and ZIP64 records when needed) instead of seeking back to
+    patch local file headers, so bytes can leave as soon as they are written.
+    """
+
+    _DONE = object()
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE, max_pending: int = MAX_PENDING_CHUNKS):
+        super().__init__()
+        self.chunk_size = chunk_size
+        self._buffer = bytearray()
+        self._queue = queue.Queue(maxsize=max_pending)  # type: queue.Queue
+        self._cancelled = threading.Event()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:  # type: ignore[override]
+        if self._cancelled.is_set():
+            raise ZipStreamCancelled()
+        self._buffer += b
+        while len(self._buffer) >= self.chunk_size:
+            self._put(bytes(self._buffer[:self.chunk_size]))
+            del self._buffer[:self.chunk_size]
+        return len(b)
+
+    def _put(self, item):
+        while True:
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full as e:
+                if self._cancelled.is_set():
+                    raise ZipStreamCancelled() from e
+
+    def finish(self):
+        if self._buffer:
+            self._put(bytes(self._buffer))
+            self._buffer.clear()
+        self._put(self._DONE)
+
+    def fail(self, error: BaseException):
+        self._put(error)
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def chunks(self) -> Iterator[bytes]:
+        while True:
+            item = self._queue.get()
+            if item is self._DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+
+def stream_zip(build: Callable[[zipfile.ZipFile], None],
+               compression: int = zipfile.ZIP_DEFLATED) -> Iterator[bytes]:
+    """Run `build` on a background thread and yield the ZIP archive in chunks.
+
+    The producer blocks once `MAX_PENDING_CHUNKS` chunks wait for the consumer,
+    so memory stays bounded regardless of the archive size. Closing the
+    iterator early (e.g. client disconnected) cancels the build.
+    """
+    stream = ZipStream()
+
+    def worker():
+        try:
+            with zipfile.ZipFile(stream, mode="w", compression=compression) as z:
+                build(z)
+            stream.finish()
+        except ZipStreamCancelled:
+            pass
+        except BaseException as e:  # pylint: disable=broad-exception-caught
+            try:
+                stream.fail(e)
+            except ZipStreamCancelled:
+                pass
+
+    thread = threading.Thread(target=worker, name="zip-stream", daemon=True)
+    thread.start()
+    try:
+        yield from stream.chunks()
+    finally:
+        stream.cancel()
+        thread.join()
@@ -0,0 +1,57 @@
+import datetime
+import uuid
+
+import pytest
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from dsw_bootstrapper import contents, models
+
+TENANT_UUID = uuid.UUID("00000000-0000-0000-0000-000000000001")
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    models.Package.__table__.create(engine)
+    with Session(engine) as session:
+        session.execute(insert(models.Package), [
+            {
+                "id": f"org:{km_id}:1.0.0",
+                "name": name,
+                "organization_id": "org",
+                "km_id": km_id,
+                "version": "1.0.0",
+                "metamodel_version": 17,
+                "description": "",
+                "readme": "",
+                "license": "",
+                "events": [],
+                "created_at": datetime.datetime.now(tz=datetime.UTC),
+                "tenant_uuid": TENANT_UUID,
+                "phase": "ReleasedPackagePhase",
+                "non_editable": False,
+            }
+            for km_id, name in [("core", "Common KM"), ("snake", "snake_case KM"),
+                                ("pct", "100% KM"), ("slash", "back\\slash KM")]
+        ])
+        yield session
+
+
+def _names(db: Session, q: str) -> list[str]:
+    rows, _ = contents.query_rows(db, TENANT_UUID, contents.CONTENT_KINDS["packages"], q=q)
+    return [row.name for row in rows]
+
+
+def test_search_matches_underscore_literally(db):
+    assert _names(db, "_") == ["snake_case KM"]
+
+
+@pytest.mark.parametrize("q, names", [
+    ("%", ["100% KM"]),
+    ("\\", ["back\\slash KM"]),
+    ("common", ["Common KM"]),
+])
+def test_search_matches_other_characters_literally(db, q, names):
+    assert _names(db, q) == names
@@ -0,0 +1,30 @@
+from dsw_bootstrapper.metrics import Metrics
+
+
+def test_render_large_counter_exactly():
+    metrics = Metrics()
+    metrics.describe("recipe_s3_bytes_total", "Bytes of S3 objects read by recipe builds.")
+    metrics.inc("recipe_s3_bytes_total", 115343360)
+    metrics.inc("recipe_s3_bytes_total", 1)
+
+    lines = metrics.render().splitlines()
+
+    assert lines == [
+        "# HELP recipe_s3_bytes_total Bytes of S3 objects read by recipe builds.",
+        "# TYPE recipe_s3_bytes_total counter",
+        "recipe_s3_bytes_total 115343361",
+    ]
+
+
+def test_render_fractional_counter_and_summary_count():
+    metrics = Metrics()
+    metrics.inc("fraction_total", 0.1, kind="a")
+    metrics.inc("fraction_total", 1234567.25, kind="a")
+    for _ in range(1000001):
+        metrics.observe("phase_seconds", 0.5, phase="plan")
+
+    lines = metrics.render().splitlines()
+
+    assert 'fraction_total{kind="a"} 1234567.35' in lines
+    assert 'phase_seconds_count{phase="plan"} 1000001' in lines
+    assert 'phase_seconds_sum{phase="plan"} 500000.500000' in lines